@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+import click
+import statistics
+import time
+from itertools import islice
+from spodgi import OdgiStore
+from spodgi.results import PreparedQueries
+
+from rdflib.store import Store
+from rdflib.term import URIRef, Variable
+from rdflib import Graph
+from rdflib import plugin
+
+# the steps on one node, a small query that is asked often with a different node each time
+template = '''PREFIX vg: <http://biohackathon.org/resource/vg#>
+SELECT ?step ?rank WHERE {
+    ?step vg:node ?node ;
+          vg:rank ?rank .
+}'''
+
+def timed(run):
+    start = time.perf_counter()
+    count = run()
+    return (time.perf_counter() - start) * 1000, count
+
+def report(name, latencies):
+    print(f'{name:<28} mean {statistics.mean(latencies):8.3f} ms   median {statistics.median(latencies):8.3f} ms   '
+          f'min {min(latencies):8.3f} ms')
+
+@click.command()
+@click.argument('odgifile')
+@click.option('--base', default='http://example.org/vg/')
+@click.option('--nodes', default=200, help='Number of nodes to look up the steps of')
+@click.option('--repeat', default=3, help='Number of times each lookup is done')
+def main(odgifile, base, nodes, repeat):
+    """Compares the latency of parsing the query for every lookup with a prepared query given the node as initial binding"""
+    plugin.register('OdgiStore', Store,'spodgi.OdgiStore', 'OdgiStore')
+    s = plugin.get('OdgiStore', Store)(base=base)
+    spodgi = Graph(store=s)
+    spodgi.open(odgifile, create=False)
+    node_iris = [URIRef(f'{base}node/{node_id}') for node_id in islice(s.node_ids(), nodes)]
+    prepared_queries = PreparedQueries()
+
+    parsed = []
+    prepared = []
+    for _ in range(repeat):
+        for node_iri in node_iris:
+            inlined = template.replace('?node', f'<{node_iri}>')
+            latency, expected = timed(lambda: len(list(spodgi.query(inlined))))
+            parsed.append(latency)
+            query = prepared_queries.prepare(spodgi, template)
+            latency, count = timed(lambda: len(list(spodgi.query(query, initBindings={Variable('node'): node_iri}))))
+            prepared.append(latency)
+            assert count == expected
+
+    print(f'{len(node_iris)} nodes, {repeat} times')
+    report('parsed per query', parsed)
+    report('prepared with initBindings', prepared)
+    print(f'speedup of the median {statistics.median(parsed) / statistics.median(prepared):.1f}x')
+    spodgi.close()
+
+if __name__ == "__main__":
+    main()
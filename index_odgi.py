@@ -0,0 +1,20 @@
+#!/usr/bin/python3
+import click
+import odgi
+from spodgi import kmers
+from spodgi import sidecar
+
+@click.command()
+@click.argument('odgifile')
+@click.option('--kmers', 'with_kmers', is_flag=True, help='Build the k-mer index of the node sequences, that motif filters use, as well')
+@click.option('--k', default=kmers.DEFAULT_K, help='Length of the k-mers of the node sequences that are indexed')
+def main(odgifile, with_kmers, k):
+    """Builds the sidecar of the node, path and step indexes, that the store maps when it opens ODGIFILE, beside ODGIFILE"""
+    odgi_graph = odgi.graph()
+    odgi_graph.load(odgifile)
+    print(sidecar.build_sidecar(odgi_graph, odgifile))
+    if with_kmers:
+        print(kmers.build_kmer_index(odgi_graph, odgifile, k))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+#!/usr/bin/python3
+import click
+from spodgi import OdgiStore
+from spodgi.kmers import motif_alternatives, path_matches
+from rdflib.store import Store
+from rdflib.term import URIRef
+from rdflib import Graph
+from rdflib import plugin
+
+@click.command()
+@click.argument('odgifile')
+@click.argument('motif')
+@click.option('--base', default='http://example.org/vg/')
+@click.option('--path', help='IRI of the path to search, by default all paths')
+def main(odgifile, motif, base, path):
+    """\
+    Finds a motif, such as GATTACA or [AT]AAT, along the paths, also where a match spans more than one step.
+    Writes the path, begin and (exclusive) end position, matched sequence and the ranks of the steps it is on.
+    """
+    plugin.register('OdgiStore', Store,'spodgi.OdgiStore', 'OdgiStore')
+    store = plugin.get('OdgiStore', Store)(base=base)
+    spodgi = Graph(store=store)
+    spodgi.open(odgifile, create=False)
+    if motif_alternatives(motif) is None:
+        raise click.BadParameter(f'{motif} is not a simple motif of bases and classes of bases', param_hint='MOTIF')
+    print('path\tbegin\tend\tsequence\tsteps')
+    for path_iri, begin, end, sequence in path_matches(store, motif, None if path is None else URIRef(path)):
+        step_index = store.step_index(path_iri.path())
+        ranks = step_index.ranks_between(begin_max=end - 1, end_min=begin + 1)
+        print(f'{path_iri}\t{begin}\t{end}\t{sequence}\t{",".join(str(rank) for rank in ranks)}')
+    spodgi.close()
+
+if __name__ == "__main__":
+    main()
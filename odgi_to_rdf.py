@@ -1,26 +1,49 @@
 #!/usr/bin/python3
-import odgi
-import rdflib
 import click
-import io
-import pprint
-from spodgi import OdgiStore
-from rdflib.store import Store
-from rdflib import Graph
-from rdflib import plugin
-    
+from spodgi import export
+
+streamed_syntaxes = ['ntriples', 'nt', 'turtle', 'ttl']
+
 @click.command()
 @click.argument('odgifile')
-@click.argument('ttl', type=click.File('wb'))
+@click.argument('ttl')
 @click.option('--base', default='http://example.org/vg/')
 @click.option('--syntax', default='ntriples')
-def main(odgifile, ttl, base, syntax):
-    plugin.register('OdgiStore', Store,'spodgi.OdgiStore', 'OdgiStore')
-    store=plugin.get('OdgiStore', Store)(base=base)
-    spodgi = Graph(store=store)
-    spodgi.open(odgifile, create=False)
-    res = spodgi.serialize(ttl, syntax)
-    spodgi.close()
+@click.option('--workers', default=1, help='Number of processes writing shards of the output in parallel')
+@click.option('--nodes-per-shard', default=1000000, help='Number of nodes in one shard of the parallel export')
+@click.option('--keep-shards', is_flag=True, help='Keep the shard files instead of concatenating them into TTL')
+@click.option('--compression', type=click.Choice(['gzip', 'xz', 'zstd']), help='Compression of the output, by default from the suffix of TTL (.gz, .xz or .zst)')
+@click.option('--triples-per-chunk', type=int, help='Start a new numbered output file after this many triples')
+@click.option('--buffer-size', default=export.DEFAULT_BUFFER_SIZE, help='Number of characters collected before they are compressed and written')
+@click.option('--rdflib', 'use_rdflib', is_flag=True, help='Serialize through rdflib instead of the streaming exporter')
+def main(odgifile, ttl, base, syntax, workers, nodes_per_shard, keep_shards, compression, triples_per_chunk,
+         buffer_size, use_rdflib):
+    if ttl == '-' and triples_per_chunk is not None:
+        raise click.BadParameter('can not split standard out into chunks', param_hint='--triples-per-chunk')
+    if use_rdflib or syntax not in streamed_syntaxes:
+        # rdflib serializes the whole graph in one go, it can not be written in shards or chunks
+        if workers != 1:
+            raise click.BadParameter('can not be combined with serializing through rdflib', param_hint='--workers')
+        if triples_per_chunk is not None:
+            raise click.BadParameter('can not be combined with serializing through rdflib',
+                                     param_hint='--triples-per-chunk')
+        # only serializing through rdflib needs its plugins
+        from rdflib.store import Store
+        from rdflib import Graph
+        from rdflib import plugin
+        plugin.register('OdgiStore', Store,'spodgi.OdgiStore', 'OdgiStore')
+        store=plugin.get('OdgiStore', Store)(base=base)
+        spodgi = Graph(store=store)
+        spodgi.open(odgifile, create=False)
+        if compression is None:
+            compression = export.compression_of(ttl)
+        out = export.Output(ttl, compression, buffer_size)
+        out.write(spodgi.serialize(format=syntax))
+        out.close()
+        spodgi.close()
+    else:
+        export.export(odgifile, ttl, base, syntax, workers, nodes_per_shard, not keep_shards, compression,
+                      triples_per_chunk, buffer_size)
 
 if __name__ == "__main__":
     main()
@@ -39,6 +39,9 @@ setup(
 	"requests",
 	"flask"
     ],
+    extras_require={
+        "zstd": ["zstandard"]
+    },
     setup_requires=[
     
     ],
@@ -48,6 +51,9 @@ setup(
     entry_points={
         'rdf.plugins.store': [
             'OdgiStore = spodgi.OdgiStore'
+        ],
+        'rdf.plugins.sparqleval': [
+            'spodgi = spodgi.evaluation:evaluate'
         ]
     }
 )
@@ -1,32 +1,147 @@
 #!/usr/bin/python3
-import odgi
-import rdflib
+import time
+started = time.perf_counter()
 import click
-import io
-import pprint
-from spodgi import OdgiStore
+import os
+import sys
+from spodgi.startup import StartupProfile
 
-from rdflib.namespace import RDF
-from rdflib.store import Store
-from rdflib import Graph
-from rdflib import plugin
+# rdflib, odgi and the store are imported once the options are parsed, see main
+
+extensions = {'json': 'srj', 'xml': 'srx', 'csv': 'csv', 'tsv': 'tsv', 'nt': 'nt'}
+
+# the graph of the batch, opened before the workers are forked so that they all share it
+spodgi = None
+
+def batch_queries(sources):
+    """The (name, query) pairs of the .rq files, the .rq files in directories, and the lines of standard in for -"""
+    for source in sources:
+        if source == '-':
+            for i, line in enumerate(sys.stdin):
+                if line.strip():
+                    yield f'query-{i:04d}', line
+        elif os.path.isdir(source):
+            for file_name in sorted(os.listdir(source)):
+                if file_name.endswith('.rq'):
+                    yield from batch_queries([os.path.join(source, file_name)])
+        else:
+            with open(source) as f:
+                yield os.path.splitext(os.path.basename(source))[0], f.read()
+
+def unique_names(queries):
+    """The (name, query) pairs, with a number added to a name that was already used, such as q-2 for the second q.rq"""
+    used = set()
+    for name, sparql in queries:
+        unique = name
+        n = 1
+        while unique in used:
+            n = n + 1
+            unique = f'{name}-{n}'
+        used.add(unique)
+        yield unique, sparql
+
+def run_query(job):
+    """Runs one query of the batch and writes its result, streamed where the format allows, to its own file"""
+    from spodgi.results import prepare, query_type, stream_query
+    name, sparql, output_dir, output_format = job
+    start = time.perf_counter()
+    try:
+        prepared = prepare(spodgi, sparql)
+        res = stream_query(spodgi, prepared, output_format)
+        result_format = output_format
+        if res is None:
+            result_format = 'nt' if query_type(prepared) in ('CONSTRUCT', 'DESCRIBE') else 'json'
+            res = [spodgi.query(prepared).serialize(format=result_format)]
+        output = os.path.join(output_dir, f'{name}.{extensions[result_format]}')
+        size = 0
+        with open(output, 'wb') as out:
+            for block in res:
+                out.write(block)
+                size = size + len(block)
+        return name, output, size, time.perf_counter() - start, None
+    except Exception as e:
+        return name, None, 0, time.perf_counter() - start, e
+
+def run_batch(sources, output_dir, output_format, workers):
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [(name, sparql, output_dir, output_format) for name, sparql in unique_names(batch_queries(sources))]
+    if workers > 1:
+        import multiprocessing
+        with multiprocessing.get_context('fork').Pool(workers) as pool:
+            done = pool.imap(run_query, jobs)
+            return report(done)
+    return report(map(run_query, jobs))
+
+def report(done):
+    failed = 0
+    for name, output, size, seconds, error in done:
+        if error is None:
+            print(f'{name}\t{seconds:.3f}s\t{size} bytes\t{output}', file=sys.stderr)
+        else:
+            failed = failed + 1
+            print(f'{name}\t{seconds:.3f}s\tfailed: {error}', file=sys.stderr)
+    return failed
 
 @click.command()
 @click.argument('odgifile')
-@click.argument('sparql')
+@click.argument('sparql', required=False)
 @click.option('--base', default='http://example.org/vg/')
 @click.option('--syntax', default='turtle')
-def main(odgifile, sparql, base, syntax):
-    
+@click.option('--bind', multiple=True, help='Initial binding of a variable, as name=term with the term in N-Triples syntax')
+@click.option('--bindings', type=click.File('r'), help='Tab separated file with the variable names as header, the query is run once per line')
+@click.option('--batch', multiple=True, help='A .rq file, a directory of .rq files, or - for one query per line on standard in, to run instead of SPARQL')
+@click.option('--output-dir', default='.', help='Directory for the result files of a batch, one per query')
+@click.option('--format', 'output_format', default='tsv', type=click.Choice(sorted(extensions)), help='Format of the result files of a batch')
+@click.option('--workers', default=1, help='Number of processes running the queries of a batch, sharing the opened graph')
+@click.option('--profile-startup', is_flag=True, help='Report on standard error how long the imports, opening the graph, preparing the query and the first result took')
+def main(odgifile, sparql, base, syntax, bind, bindings, batch, output_dir, output_format, workers, profile_startup):
+    global spodgi
+    if not batch and sparql is None:
+        raise click.UsageError('Give a SPARQL query or --batch')
+    profile = StartupProfile(profile_startup, started)
+    profile.mark('options')
+    from rdflib.store import Store
+    from rdflib import Graph
+    from rdflib import plugin
+    from spodgi.results import PreparedQueries, bindings_from
+    profile.mark('imports')
+
     plugin.register('OdgiStore', Store,'spodgi.OdgiStore', 'OdgiStore')
     s = plugin.get('OdgiStore', Store)(base=base)
     spodgi = Graph(store=s)
     spodgi.open(odgifile, create=False)
-    res = spodgi.query(sparql)
-    
-    for row in res:
-        print(row)
+    profile.mark('open')
+    if batch:
+        failed = run_batch(batch, output_dir, output_format, workers)
+        spodgi.close()
+        profile.mark('batch')
+        profile.report()
+        sys.exit(1 if failed else 0)
+    # parsed once, also when it is run for every line of the bindings file
+    prepared = PreparedQueries().prepare(spodgi, sparql)
+    profile.mark('prepare')
+    given = [tuple(b.split('=', 1)) for b in bind]
+    if bindings is None:
+        rows = [given]
+    else:
+        names = bindings.readline().rstrip('\n').split('\t')
+        rows = (given + list(zip(names, line.rstrip('\n').split('\t'))) for line in bindings if line.strip())
+
+    first = True
+    for values in rows:
+        try:
+            init_bindings = bindings_from(spodgi, values)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint='--bind' if bindings is None else '--bind/--bindings')
+        res = spodgi.query(prepared, initBindings=init_bindings)
+        for row in res:
+            if first:
+                profile.mark('first result')
+                first = False
+            print(row)
+    profile.mark('all results')
     spodgi.close()
+    profile.report()
 
 if __name__ == "__main__":
     main()
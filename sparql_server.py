@@ -1,7 +1,12 @@
 #!/usr/bin/python3
 from flask import Flask, request, jsonify, Response, g
 from spodgi import OdgiStore
+from spodgi.prefork import Admission, serve
+from spodgi.cache import LruCache
+from spodgi.results import PreparedQueries, blocks, bindings_from, cached_blocks, normalize_query, query_type, stream_query
+from spodgi.subgraph import node_id_from, subgraph_triples
 import click
+import os
 import sys
 import json
 
@@ -15,48 +20,151 @@ def resultformat_to_mime(format):
     if format=='xml': return "application/sparql-results+xml"
     if format=='json': return "application/sparql-results+json"
     if format=='html': return "text/html"
+    if format=='csv': return "text/csv"
+    if format=='tsv': return "text/tab-separated-values"
+    if format=='nt': return "application/n-triples"
     return "text/plain"
 
-def get_format_and_mimetype(accept_headers, output_format):
+# the formats a client can ask for with Accept, by query type, the first is the default
+negotiable_formats = {
+    'SELECT': [('xml', 'application/sparql-results+xml'), ('json', 'application/sparql-results+json'),
+               ('csv', 'text/csv'), ('tsv', 'text/tab-separated-values')],
+    'ASK': [('xml', 'application/sparql-results+xml'), ('json', 'application/sparql-results+json')],
+    'CONSTRUCT': [('nt', 'application/n-triples'), ('turtle', 'text/turtle'), ('xml', 'application/rdf+xml')],
+    'DESCRIBE': [('nt', 'application/n-triples'), ('turtle', 'text/turtle'), ('xml', 'application/rdf+xml')]
+}
 
+def get_format_and_mimetype(accept_mimetypes, output_format, kind='SELECT'):
+    """\
+    The output format and its mimetype, as given with output, otherwise the one of the formats for
+    the query type that the client accepts most, by the q-values of Accept, or the default for the query type
+    """
+    formats = negotiable_formats.get(kind, negotiable_formats['SELECT'])
     if not output_format:
-        output_format = "xml"
-        if "text/html" in accept_headers:
-            output_format = "html"
-        if "application/sparql-results+json" in accept_headers:
-            output_format = "json"
-        
-    mimetype = resultformat_to_mime(output_format)
+        format_of = dict((mimetype, format) for format, mimetype in formats)
+        mimetype = accept_mimetypes.best_match(list(format_of), default=formats[0][1])
+        output_format = format_of[mimetype]
+    else:
+        mimetype = dict(formats).get(output_format, resultformat_to_mime(output_format))
     mimetype = request.values.get("force-accept", mimetype)
 
     return output_format, mimetype
 
 app = Flask(__name__)
 spodgi = None
+# identifies the loaded odgi file, so that cached results are never used for an other graph
+graph_identity = None
+results = LruCache(256, 64 * 1024 * 1024)
+max_cached_result = 4 * 1024 * 1024
+prepared_queries = PreparedQueries(128)
+
 @app.route('/sparql')
 def sparql_endpoint():
     query = request.args.get('query')
+    # prepared first, the formats that can be asked for depend on the type of the query
+    prepared = prepared_queries.prepare(spodgi, query)
 
-    accept_headers = request.headers["Accept"]
     output_format = request.values.get("output", None)
 
-    output_format, mimetype = get_format_and_mimetype(accept_headers, output_format)
+    output_format, mimetype = get_format_and_mimetype(request.accept_mimetypes, output_format, query_type(prepared))
+
+    # a parameter $name=term gives the variable ?name a value before the query is evaluated
+    try:
+        bindings = bindings_from(spodgi, ((name[1:], value) for name, value in request.args.items() if name.startswith('$')))
+    except ValueError as e:
+        return Response(f'{e}\n', status=400, mimetype='text/plain')
+    key = (normalize_query(query), frozenset(bindings.items()), output_format, graph_identity)
+    cached = results.get(key)
+    if cached is not None:
+        response = Response(cached)
+        response.headers["Content-Type"] = mimetype
+        response.headers["X-Cache"] = "HIT"
+        return response
 
-    res = spodgi.query(query).serialize(format = output_format)
+    # rows are sent as they are found, unless the format needs rdflib to serialize the whole result
+    res = stream_query(spodgi, prepared, output_format, bindings)
+    if res is None:
+        res = spodgi.query(prepared, initBindings=bindings).serialize(format = output_format)
+        if len(res) <= max_cached_result:
+            results.put(key, res, len(res))
+    else:
+        res = cached_blocks(res, results, key, max_cached_result)
     
     response = Response(res)
     response.headers["Content-Type"] = mimetype
+    response.headers["X-Cache"] = "MISS"
     return response
-@click.command()
-@click.argument('odgifile')
-@click.option('--base', default='http://example.org/vg/')
-def main(odgifile, base):
-    global spodgi
+
+def count_arg(name: str):
+    """A parameter that is a number of edges or bases, None if it is not given"""
+    value = request.args.get(name)
+    if value is None:
+        return None
+    if not (value.isascii() and value.isdigit()):
+        raise ValueError(f'{name} must be a whole number of at least 0, not {value}')
+    return int(value)
+
+@app.route('/subgraph')
+def subgraph_endpoint():
+    """The subgraph around the node parameters, within hops edges and distance bases, streamed as N-Triples"""
+    store = spodgi.store
+    try:
+        node_ids = [node_id_from(store, node) for node in request.args.getlist('node')]
+        hops = count_arg('hops')
+        distance = count_arg('distance')
+        if not node_ids:
+            raise ValueError('give at least one node parameter')
+        node_ids = store.neighbourhood(node_ids, hops, distance, request.args.get('direction') != 'forward')
+    except ValueError as e:
+        return Response(f'{e}\n', status=400, mimetype='text/plain')
+    steps = request.args.get('steps', 'true') != 'false'
+    rows = (f'{s} {p} {o} .\n' for s, p, o in subgraph_triples(store, node_ids, steps))
+    return Response(blocks(rows, 64 * 1024), mimetype='application/n-triples')
+
+@app.route('/cache')
+def cache_statistics():
+    return jsonify({'results': results.stats(), 'prepared': prepared_queries.stats()})
+
+@app.route('/void')
+def void_description():
+    res = spodgi.store.void_description().serialize(format='turtle')
+    return Response(res, mimetype='text/turtle')
+
+def open_graph(odgifile, base):
+    global spodgi, graph_identity
+    stat = os.stat(odgifile)
+    graph_identity = (os.path.abspath(odgifile), stat.st_mtime_ns, stat.st_size, base)
     plugin.register('OdgiStore', Store,'spodgi.OdgiStore', 'OdgiStore')
     store = plugin.get('OdgiStore', Store)(base=base)
     spodgi = Graph(store=store)
     spodgi.open(odgifile, create=False)
-    app.run(host='0.0.0.0',port=5001)
+
+@click.command()
+@click.argument('odgifile')
+@click.option('--base', default='http://example.org/vg/')
+@click.option('--host', default='0.0.0.0')
+@click.option('--port', default=5001)
+@click.option('--workers', default=0, help='Number of worker processes that each open ODGIFILE, 0 runs the flask development server')
+@click.option('--concurrency', default=1, help='Number of queries a worker evaluates at the same time')
+@click.option('--max-waiting', default=16, help='Number of requests a worker lets wait for a free slot, more get a 503')
+@click.option('--queue-timeout', default=30.0, help='Seconds a request waits for a free slot before it gets a 503')
+@click.option('--backlog', default=128, help='Number of connections that wait for a worker to accept them')
+@click.option('--cache-entries', default=256, help='Number of query results a worker keeps, 0 turns the result cache off')
+@click.option('--cache-bytes', default=64 * 1024 * 1024, help='Total size of the query results a worker keeps')
+@click.option('--cache-max-result', default=4 * 1024 * 1024, help='Size of the largest query result that is kept')
+@click.option('--prepared-queries', 'prepared_query_count', default=128, help='Number of parsed queries a worker keeps')
+def main(odgifile, base, host, port, workers, concurrency, max_waiting, queue_timeout, backlog, cache_entries,
+         cache_bytes, cache_max_result, prepared_query_count):
+    global results, max_cached_result, prepared_queries
+    results = LruCache(cache_entries, cache_bytes)
+    max_cached_result = cache_max_result
+    prepared_queries = PreparedQueries(prepared_query_count)
+    if workers <= 0:
+        open_graph(odgifile, base)
+        app.run(host=host,port=port)
+    else:
+        app.wsgi_app = Admission(app.wsgi_app, concurrency, max_waiting, queue_timeout)
+        serve(app, host, port, workers, backlog=backlog, initializer=lambda: open_graph(odgifile, base))
 
 if __name__ == '__main__':
     main()
@@ -7,15 +7,23 @@ from rdflib.store import Store
 from rdflib.term import Literal, URIRef, Identifier, Node, BNode
 from rdflib import Graph
 from rdflib import plugin
+from collections import deque
+import heapq
 from itertools import chain
+from array import array
 from spodgi.term import StepIriRef, NodeIriRef, StepBeginIriRef, StepEndIriRef, PathIriRef
-from urllib.parse import urlparse
-from typing import List
+from spodgi.index import NodeIds, NodeLengths, PathStepIndex
+from spodgi.kmers import KmerIndex
+from spodgi.sidecar import Sidecar
+from spodgi.statistics import GraphStatistics
+from spodgi.cache import LruCache
+from typing import Dict
 import re
 
 
 VG = Namespace('http://biohackathon.org/resource/vg#')
 FALDO = Namespace('http://biohackathon.org/resource/faldo#')
+VOID = Namespace('http://rdfs.org/ns/void#')
 
 knownTypes = [VG.Node, VG.Path, VG.Step, FALDO.Region, FALDO.ExactPosition, FALDO.Position]
 knownPredicates = [RDF.value, VG.rank, VG.position, VG.path, VG.linksForwardToForward,
@@ -23,6 +31,8 @@ knownPredicates = [RDF.value, VG.rank, VG.position, VG.path, VG.linksForwardToFo
                    VG.reverseOfNode, VG.node, FALDO.begin, FALDO.end, FALDO.reference, FALDO.position]
 nodeRelatedPredicates = [VG.linksForwardToForward, VG.linksForwardToReverse, VG.linksReverseToForward,
                          VG.linksReverseToReverse, VG.links, RDF.value]
+edgePredicates = [VG.linksForwardToForward, VG.linksForwardToReverse, VG.linksReverseToForward,
+                  VG.linksReverseToReverse, VG.links]
 stepAssociatedTypes = [FALDO.Region, FALDO.ExactPosition, FALDO.Position, VG.Step]
 stepAssociatedPredicates = [VG.rank, VG.position, VG.path, VG.node, VG.reverseOfNode, FALDO.begin, FALDO.end,
                             FALDO.reference, FALDO.position]
@@ -30,31 +40,104 @@ stepAssociatedPredicates = [VG.rank, VG.position, VG.path, VG.node, VG.reverseOf
 __all__ = ['OdgiStore']
 
 
-class CollectEdges:
-    def __init__(self, edges):
-        self.edges = edges
+# the edge predicate of an edge by whether the node it leaves and the node it enters are in reverse
+edgeOrientations = {(False, False): VG.linksForwardToForward, (False, True): VG.linksForwardToReverse,
+                    (True, False): VG.linksReverseToForward, (True, True): VG.linksReverseToReverse}
+
+
+def oriented_edge(left_id: int, left_reverse: bool, right_id: int, right_reverse: bool):
+    """\
+    An edge as its triples are generated, as (node id, orientation, other node id). The edge a -> b is the
+    same edge as flip(b) -> flip(a), of the two the one is taken that leaves the smaller handle, by node id
+    and then forward before reverse, as odgi's for_each_edge does. That way an edge is the same from
+    whichever side it is found.
+    """
+    if (left_id, left_reverse) > (right_id, not right_reverse):
+        left_id, left_reverse, right_id, right_reverse = right_id, not right_reverse, left_id, not left_reverse
+    return left_id, edgeOrientations[left_reverse, right_reverse], right_id
+
+
+class OrientEdges:
+    """\
+    Keeps the edges on both sides of a node, as oriented_edge gives them, in one list that is cleared for
+    every next node. A link of a node to itself that is found from both of its sides is kept once.
+    """
+
+    def __init__(self, odgi_graph: odgi):
+        self.odgi_graph = odgi_graph
+        self.edges = []
+        self._handle = None
+        self._left = False
+
+    def follow(self, handle: odgi.handle):
+        """The edges of the node of the handle"""
+        self.edges.clear()
+        self._handle = self.odgi_graph.get_handle(self.odgi_graph.get_id(handle))
+        self._left = False
+        self.odgi_graph.follow_edges(self._handle, False, self)
+        self._left = True
+        self.odgi_graph.follow_edges(self._handle, True, self)
+        return self.edges
 
     def __call__(self, edge_handle):
-        self.edges.append(edge_handle)
+        node_id = self.odgi_graph.get_id(self._handle)
+        other_id = self.odgi_graph.get_id(edge_handle)
+        other_reverse = self.odgi_graph.get_is_reverse(edge_handle)
+        if not self._left:
+            self.edges.append(oriented_edge(node_id, False, other_id, other_reverse))
+        elif other_id != node_id or other_reverse:
+            # n+ -> n+ is on the right side as well
+            self.edges.append(oriented_edge(other_id, other_reverse, node_id, False))
+
+
+class CollectEdges:
+    """\
+    Keeps every edge that for_each_edge finds, as oriented_edge gives them, in arrays of the node ids and of
+    the index of the orientation in orientations.
+    """
+    orientations = list(edgeOrientations.values())
+
+    def __init__(self, odgi_graph: odgi):
+        self.odgi_graph = odgi_graph
+        self.node_ids = array('Q')
+        self.orientations_of = array('B')
+        self.other_ids = array('Q')
+
+    def __call__(self, edge):
+        left, right = edge
+        node_id, orientation, other_id = oriented_edge(self.odgi_graph.get_id(left),
+                                                       self.odgi_graph.get_is_reverse(left),
+                                                       self.odgi_graph.get_id(right),
+                                                       self.odgi_graph.get_is_reverse(right))
+        self.node_ids.append(node_id)
+        self.orientations_of.append(self.orientations.index(orientation))
+        self.other_ids.append(other_id)
+        # odgi stops at a callback that returns false
+        return True
+
+    def edges(self):
+        orientations = self.orientations
+        for node_id, orientation, other_id in zip(self.node_ids, self.orientations_of, self.other_ids):
+            yield node_id, orientations[orientation], other_id
 
 
 class CollectPaths:
     path = re.compile('https?://')
-    def __init__(self, paths: List[PathIriRef], odgi_graph: odgi, base: str):
-        self.known_paths = paths
+    def __init__(self, paths_by_name: Dict[str, PathIriRef], paths_by_iri: Dict[str, PathIriRef], odgi_graph: odgi,
+                 base: str):
+        self.paths_by_name = paths_by_name
+        self.paths_by_iri = paths_by_iri
         self.odgi_graph = odgi_graph
         self.base = base
 
     def __call__(self, path_handle):
         name = self.odgi_graph.get_path_name(path_handle)
-        try:
-            if self.path.match(name):
-                result = urlparse(name)
-                self.known_paths.append(PathIriRef(name, path_handle))
-            else:
-                self.known_paths.append(PathIriRef(f'{self.base}path/{name}', path_handle))
-        except ValueError:
-            self.known_paths.append(PathIriRef(f'{self.base}path/{name}', path_handle))
+        if self.path.match(name):
+            path_iri = PathIriRef(name, path_handle, f'{name}-step-', f'{name}-p')
+        else:
+            path_iri = PathIriRef(f'{self.base}path/{name}', path_handle)
+        self.paths_by_name[name] = path_iri
+        self.paths_by_iri[path_iri.unicode()] = path_iri
 
 
 class OdgiStore(Store):
@@ -67,11 +150,15 @@ class OdgiStore(Store):
     """
     odgi_graph: odgi
 
-    knownPaths: List[PathIriRef] = []
+    pathsByName: Dict[str, PathIriRef]
+    pathsByIri: Dict[str, PathIriRef]
     namespace_manager: NamespaceManager
     base: str
 
-    def __init__(self, configuration=None, identifier=None, base=None):
+    # a rough size of a cached term, its IRI string and its key
+    termBytes = 256
+
+    def __init__(self, configuration=None, identifier=None, base=None, term_cache_bytes=64 * 1024 * 1024):
         super(OdgiStore, self).__init__(configuration)
         self.namespace_manager = NamespaceManager(Graph())
         self.bind('vg', VG)
@@ -87,12 +174,55 @@ class OdgiStore(Store):
         self.bind('path', self.pathNS)
         self.bind('step', self.stepNS)
         self.odgi_graph = None
+        self.stepIndexes = {}
+        self.nodeIds = None
+        self.nodeLengths = None
+        self.kmerIndex = None
+        self.sidecar = None
+        self.statistics = None
+        self.pathsByName = {}
+        self.pathsByIri = {}
+        self.allPaths = False
+        # shared node and step terms, so that the same handle is not wrapped again for every triple
+        self.terms = LruCache(term_cache_bytes // self.termBytes)
 
     def open(self, odgi_file, create=False):
         og = odgi.graph()
         ogf = og.load(odgi_file)
         self.odgi_graph = og
-        self.odgi_graph.for_each_path_handle(CollectPaths(self.knownPaths, self.odgi_graph, self.base))
+        self.stepIndexes = {}
+        self.nodeIds = None
+        self.nodeLengths = None
+        self.terms.clear()
+        # the k-mer index of the node sequences, if one was built for this odgi file
+        self.kmerIndex = KmerIndex.load(odgi_file)
+        # the indexes kept beside the odgi file, if they were built for this version of it
+        self.sidecar = Sidecar.load(odgi_file)
+        # make sure our evaluation of the SPARQL algebra is registered with rdflib
+        import spodgi.evaluation
+        # the paths are looked up by name as they are asked for, and only all listed when they all are
+        self.pathsByName = {}
+        self.pathsByIri = {}
+        self.allPaths = False
+        if self.sidecar is None:
+            self.statistics = GraphStatistics(self.odgi_graph)
+        else:
+            self.nodeIds = self.sidecar.node_ids(self.odgi_graph)
+            self.nodeLengths = self.sidecar.node_lengths(self.odgi_graph, self.nodeIds)
+            self.statistics = GraphStatistics(self.odgi_graph, edge_count=self.sidecar.edge_count,
+                                              step_count=self.sidecar.step_count())
+
+    def close(self, commit_pending_transaction=False):
+        if self.kmerIndex is not None:
+            self.kmerIndex.close()
+            self.kmerIndex = None
+        if self.sidecar is not None:
+            # the indexes taken from the sidecar point into its pages
+            self.stepIndexes = {}
+            self.nodeIds = None
+            self.nodeLengths = None
+            self.sidecar.close()
+            self.sidecar = None
 
     def triples(self, triple_pattern, context=None):
         """A generator over all the triples matching """
@@ -126,10 +256,10 @@ class OdgiStore(Store):
             subject_iri_parts = subject.toPython().split('/')
             if 'node' == subject_iri_parts[-2] and self.odgi_graph.has_node(int(subject_iri_parts[-1])):
                 handle = self.odgi_graph.get_handle(int(subject_iri_parts[-1]))
-                ns = NodeIriRef(handle, self.odgi_graph, self.base)
+                ns = self.node_iri(handle)
                 return chain(self.handle_to_triples(predicate, obj, handle),
                              self.handle_to_edge_triples(ns, predicate, obj))
-            elif 'path' == subject_iri_parts[-4] and 'step' == subject_iri_parts[-2]:
+            elif 'path' == subject_iri_parts[-4] and subject_iri_parts[-2] in ('step', 'position'):
                 return self.steps(subject, predicate, obj)
             elif 'path' == subject_iri_parts[-2]:
                 return self.paths(subject, predicate, obj)
@@ -165,26 +295,22 @@ class OdgiStore(Store):
 
     def nodes(self, subject: Identifier, predicate: URIRef, obj: Node):
         if subject is not None:
+            # handle_to_triples gives the type triple, once
             is_node_iri = self.is_node_iri_in_graph(subject)
-            if predicate == RDF.type and obj == VG.Node and is_node_iri:
-                yield [(subject, RDF.type, VG.Node), None]
-            elif predicate is None and obj == VG.Node and is_node_iri:
-                yield [(subject, RDF.type, VG.Node), None]
-            elif predicate is None and is_node_iri:
-                yield [(subject, RDF.type, VG.Node), None]
-
             if type(subject) == NodeIriRef:
                 yield from self.handle_to_triples(predicate, obj, subject.node_handle())
                 yield from self.handle_to_edge_triples(subject, predicate, obj)
             elif is_node_iri:
                 subject_iri_parts = subject.toPython().split('/')
                 nh = self.odgi_graph.get_handle(int(subject_iri_parts[-1]))
-                ns = NodeIriRef(nh,self.base, self.odgi_graph)
+                ns = self.node_iri(nh)
                 yield from self.handle_to_triples(predicate, obj, nh)
                 yield from self.handle_to_edge_triples(ns, predicate, obj)
+        elif predicate in edgePredicates:
+            yield from self.edge_triples(predicate, obj)
         else:
             for handle in self.handles():
-                ns = NodeIriRef (handle, self.base, self.odgi_graph)
+                ns = self.node_iri(handle)
                 yield from self.nodes(ns, predicate, obj)
 
     def is_node_iri_in_graph(self, iri: URIRef):
@@ -192,35 +318,37 @@ class OdgiStore(Store):
             return True
         else:
             iri_parts = iri.toPython().split('/')
-            return 'node' == iri_parts[-2] and self.odgi_graph.has_node(int(iri_parts[-1]))
+            return len(iri_parts) > 1 and 'node' == iri_parts[-2] and iri_parts[-1].isdigit() and \
+                self.odgi_graph.has_node(int(iri_parts[-1]))
 
     def paths(self, subject: Identifier, predicate: URIRef, obj: Node):
-        for p in self.knownPaths:
-            if subject is None or p == subject:
-                # given at RDF.type and the VG.Path as obj we can generate the matching triple
-                if (predicate is None or predicate == RDF.type) and (obj is None or obj == VG.Path):
-                    yield [(p, RDF.type, VG.Path), None]
+        for p in self.matching_paths(subject):
+            # given at RDF.type and the VG.Path as obj we can generate the matching triple
+            if (predicate is None or predicate == RDF.type) and (obj is None or obj == VG.Path):
+                yield [(p, RDF.type, VG.Path), None]
 
     def steps(self, subject: Identifier, predicate: URIRef, obj: Node):
 
         if subject is None:
-            for pathRef in self.knownPaths:
-                if not self.odgi_graph.is_empty(pathRef.path()):
-                    rank = 1
-                    position = 1
-                    step_handle = self.odgi_graph.path_begin(pathRef.path())
-                    node_handle = self.odgi_graph.get_handle_of_step(step_handle)
-                    yield from self.step_handle_to_triples(step_handle, subject, predicate, obj, node_handle=node_handle,
-                                                           rank=rank, position=position)
-
-                    while self.odgi_graph.has_next_step(step_handle):
-                        step_handle = self.odgi_graph.get_next_step(step_handle)
-                        position = position + self.odgi_graph.get_length(node_handle)
-                        node_handle = self.odgi_graph.get_handle_of_step(step_handle)
-                        rank = rank + 1
-                        yield from self.step_handle_to_triples(step_handle, subject, predicate, obj,
-                                                               node_handle=node_handle,
-                                                               rank=rank, position=position)
+            if (predicate == VG.node or predicate == VG.reverseOfNode) and obj is not None:
+                yield from self.steps_of_node(obj, subject, predicate, obj)
+                return
+            if (predicate == VG.path or predicate == FALDO.reference) and obj is not None:
+                path_refs = self.matching_paths(obj)
+            else:
+                path_refs = self.all_paths()
+            if predicate == FALDO.position and isinstance(obj, Literal):
+                position = obj.toPython()
+                if type(position) == int:
+                    for pathRef in path_refs:
+                        yield from self.steps_at_position(pathRef, position, subject, predicate, obj)
+                return
+            for pathRef in path_refs:
+                step_index = self.step_index(pathRef.path())
+                for rank in step_index.ranks():
+                    yield from self.step_handle_to_triples(step_index.step(rank), subject, predicate, obj,
+                                                           rank=rank, position=step_index.position(rank),
+                                                           path_iri=pathRef)
         elif type(subject) == StepIriRef:
             yield from self.step_handle_to_triples(subject.step_handle(), subject, predicate, obj, rank=subject.rank(),
                                                    position=subject.position())
@@ -233,30 +361,121 @@ class OdgiStore(Store):
         else:
             subject_iri_parts = subject.toPython().split('/')
             if 'path' == subject_iri_parts[-4] and 'step' == subject_iri_parts[-2]:
-                path_name = subject_iri_parts[-3];
-                path_handle = self.odgi_graph.get_path_handle(path_name)
+                path_iri = self.path_named(subject_iri_parts[-3])
+                if path_iri is None:
+                    return
                 step_rank = int(subject_iri_parts[-1]);
+                step_index = self.step_index(path_iri.path())
+                if step_index.has_rank(step_rank):
+                    yield from self.step_handle_to_triples(step_index.step(step_rank), subject, predicate, obj,
+                                                           rank=step_rank, position=step_index.position(step_rank),
+                                                           path_iri=path_iri)
+            elif 'path' == subject_iri_parts[-4] and 'position' == subject_iri_parts[-2]:
+                path_iri = self.path_named(subject_iri_parts[-3])
+                if path_iri is not None:
+                    yield from self.steps_at_position(path_iri, int(subject_iri_parts[-1]), subject, predicate, obj)
+
+    def steps_at_position(self, path_iri: PathIriRef, position: int, subject: Identifier, predicate: URIRef,
+                          obj: Node):
+        """\
+        The faldo triples of the positions on a path that equal the given position.
+
+        A position is both the end of a step and the begin of the next one. Without a subject both are
+        generated, as a full scan would. For a given position IRI only one of them is used.
+        """
+        step_index = self.step_index(path_iri.path())
+        end_rank = step_index.rank_ending_at(position)
+        begin_rank = step_index.rank_starting_at(position)
+        if end_rank is not None and (subject is None or begin_rank is None):
+            step_iri = self.step_iri(step_index.step(end_rank), path_iri, end_rank, step_index.position(end_rank))
+            yield from self.faldo_for_step(step_iri, self.step_end(step_iri), predicate, obj)
+        if begin_rank is not None:
+            step_iri = self.step_iri(step_index.step(begin_rank), path_iri, begin_rank,
+                                     step_index.position(begin_rank))
+            yield from self.faldo_for_step(step_iri, self.step_begin(step_iri), predicate, obj)
+
+    def steps_of_node(self, node_iri: Node, subject: Identifier, predicate: URIRef, obj: Node):
+        """The triples of the steps that visit a node"""
+        for path_ref, step_index, ranks in self.step_ranks(node=node_iri):
+            for rank in ranks:
+                yield from self.step_handle_to_triples(step_index.step(rank), subject, predicate, obj,
+                                                       rank=rank, position=step_index.position(rank),
+                                                       path_iri=path_ref)
+
+    def step_ranks(self, path: Identifier = None, node: Node = None):
+        """\
+        The step index and the ranks of the steps on each path, optionally limited to one path or one node.
+
+        For a node odgi's steps_of_handle gives the paths through it, the ranks on those paths come
+        from the step index.
+        """
+        if node is None:
+            for path_ref in self.matching_paths(path):
+                step_index = self.step_index(path_ref.path())
+                yield path_ref, step_index, step_index.ranks()
+            return
+        if not isinstance(node, URIRef) or not self.is_node_iri_in_graph(node):
+            return
+        if type(node) == NodeIriRef:
+            node_handle = node.node_handle()
+        else:
+            node_handle = self.odgi_graph.get_handle(int(node.toPython().split('/')[-1]))
+        node_id = self.odgi_graph.get_id(node_handle)
+        seen_paths = set()
+        for step_handle in self.odgi_graph.steps_of_handle(node_handle, False):
+            path_handle = self.odgi_graph.get_path_handle_of_step(step_handle)
+            path_name = self.odgi_graph.get_path_name(path_handle)
+            if path_name not in seen_paths:
+                seen_paths.add(path_name)
+                path_ref = self.find_path_iri_by_handle(path_handle)
+                if path is None or path_ref == path:
+                    step_index = self.step_index(path_handle)
+                    yield path_ref, step_index, step_index.ranks_of_node(node_id)
+
+    def step_table(self, path: Identifier = None, node: Node = None):
+        """\
+        Each step with its node, orientation, path, rank and position, in one pass over the step indexes.
+        Optionally limited to the steps of one path or of one node.
+        """
+        for path_ref, step_index, ranks in self.step_ranks(path, node):
+            for rank in ranks:
+                step_handle = step_index.step(rank)
+                position = step_index.position(rank)
+                node_handle = self.odgi_graph.get_handle_of_step(step_handle)
+                yield (self.step_iri(step_handle, path_ref, rank, position), self.node_iri(node_handle),
+                       self.odgi_graph.get_is_reverse(node_handle), path_ref, rank, position)
+
+    def steps_in_range(self, path: Identifier, start: int, end: int):
+        """\
+        The steps of a path that overlap the positions from start up to and including end.
+
+        A step covers the positions from its begin up to, but not including, its end.
+        """
+        return self.steps_between(path, begin_max=end, end_min=start + 1)
+
+    def steps_between(self, path: Identifier = None, begin_min: int = None, begin_max: int = None,
+                      end_min: int = None, end_max: int = None):
+        """The steps, of one or all paths, with begin and end positions within the given (inclusive) bounds"""
+        for path_ref, step_index, ranks in self.step_ranks(path):
+            for rank in step_index.ranks_between(begin_min, begin_max, end_min, end_max):
+                yield self.step_iri(step_index.step(rank), path_ref, rank, step_index.position(rank))
+
+    def step_index(self, path_handle: odgi.path_handle):
+        """The rank/position index of a path, built on first use"""
+        path_name = self.odgi_graph.get_path_name(path_handle)
+        step_index = self.stepIndexes.get(path_name)
+        if step_index is None:
+            if self.sidecar is not None:
+                step_index = self.sidecar.step_index(self.odgi_graph, path_handle)
+            if step_index is None:
+                step_index = PathStepIndex(self.odgi_graph, path_handle)
+            self.stepIndexes[path_name] = step_index
+        return step_index
 
-                if not self.odgi_graph.is_empty(path_handle):
-                    rank = 1
-                    position = 1
-                    step_handle = self.odgi_graph.path_begin(path_handle)
-                    node_handle = self.odgi_graph.get_handle_of_step(step_handle)
-                    while rank != step_rank and self.odgi_graph.has_next_step(step_handle):
-                        rank = rank + 1
-                        position = position + self.odgi_graph.get_length(node_handle)
-                        step_handle = self.odgi_graph.get_next_step(step_handle)
-                        node_handle = self.odgi_graph.get_handle_of_step(step_handle)
-                    yield from self.step_handle_to_triples(step_handle, subject, predicate, obj, node_handle=node_handle,
-                                                           rank=rank, position=position)
-
-    # else:
-    # for nodeHandle in self.handles():
-    # for step_handle in self.odgi_graph.steps_of_handle(nodeHandle, False):
-    # yield from self.stepHandleToTriples(step_handle, subject, predicate, obj, nodeHandle=nodeHandle)
     def step_handle_to_triples(self,
                                step_handle: odgi.step_handle, subject: Identifier, predicate: URIRef, obj: Node,
-                               node_handle: odgi.handle = None, rank=None, position=None):
+                               node_handle: odgi.handle = None, rank=None, position=None,
+                               path_iri: PathIriRef = None):
 
         if type(subject) == StepIriRef:
             step_iri = subject
@@ -265,7 +484,7 @@ class OdgiStore(Store):
         elif type(subject) == StepEndIriRef:
             step_iri = subject.step_iri()
         else:
-            step_iri = StepIriRef(step_handle, self.base, self.odgi_graph, position, rank)
+            step_iri = self.step_iri(step_handle, path_iri, rank, position)
 
         if subject is None or step_iri == subject:
             if predicate == RDF.type or predicate is None:
@@ -275,13 +494,12 @@ class OdgiStore(Store):
                     yield [(step_iri, RDF.type, FALDO.Region), None]
             if node_handle is None:
                 node_handle = self.odgi_graph.get_handle_of_step(step_handle)
-            node_iri = NodeIriRef(node_handle, self.base, self.odgi_graph)
-            if (predicate == VG.node or predicate is None and not self.odgi_graph.get_is_reverse(node_handle)) and (
-                    obj is None or node_iri == obj):
+            node_iri = self.node_iri(node_handle)
+            is_reverse = self.odgi_graph.get_is_reverse(node_handle)
+            if (predicate == VG.node or predicate is None) and not is_reverse and (obj is None or node_iri == obj):
                 yield [(step_iri, VG.node, node_iri), None]
 
-            if (predicate == VG.reverseOfNode or predicate is None and self.odgi_graph.get_is_reverse(node_handle)) and (
-                    obj is None or node_iri == obj):
+            if (predicate == VG.reverseOfNode or predicate is None) and is_reverse and (obj is None or node_iri == obj):
                 yield [(step_iri, VG.reverseOfNode, node_iri), None]
 
             if (predicate == VG.rank or predicate is None) and rank is not None:
@@ -295,21 +513,20 @@ class OdgiStore(Store):
                     yield [(step_iri, VG.position, position), None]
 
             if predicate == VG.path or predicate is None:
-                path = self.odgi_graph.get_path_handle_of_step(step_handle)
-                path_iri = self.find_path_iri_by_handle(path)
+                path_iri = self.path_iri_of_step(step_iri)
                 if obj is None or path_iri == obj:
                     yield [(step_iri, VG.path, path_iri), None]
 
             if predicate is None or predicate == FALDO.begin:
-                yield [(step_iri, FALDO.begin, StepBeginIriRef(step_iri)), None]
+                yield [(step_iri, FALDO.begin, self.step_begin(step_iri)), None]
 
             if predicate is None or predicate == FALDO.end:
-                yield [(step_iri, FALDO.end, StepEndIriRef(step_iri)), None]
+                yield [(step_iri, FALDO.end, self.step_end(step_iri)), None]
 
             if subject is None:
-                begin = StepBeginIriRef(step_iri)
+                begin = self.step_begin(step_iri)
                 yield from self.faldo_for_step(step_iri, begin, predicate, obj)
-                end = StepEndIriRef(step_iri)
+                end = self.step_end(step_iri)
                 yield from self.faldo_for_step(step_iri, end, predicate, obj)
 
         if (type(subject) == StepBeginIriRef) and step_iri == subject.step_iri():
@@ -326,49 +543,345 @@ class OdgiStore(Store):
         if (predicate is None or predicate == RDF.type) and (obj is None or obj == FALDO.Position):
             yield [(subject, RDF.type, FALDO.Position), None]
         if predicate is None or predicate == FALDO.reference:
-            path = step_iri.path()
-            path_iri = self.find_path_iri_by_handle(path)
+            path_iri = self.path_iri_of_step(step_iri)
             if obj is None or obj == path_iri:
                 yield [(subject, FALDO.reference, path_iri), None]
 
     def handle_to_triples(self, predicate, obj, node_handle: odgi.handle):
-        node_iri = NodeIriRef(node_handle,self.base, self.odgi_graph)
+        node_iri = self.node_iri(node_handle)
 
         if predicate == RDF.value or predicate is None:
             seq_value = rdflib.term.Literal(self.odgi_graph.get_sequence(node_handle))
             if obj is None or obj == seq_value:
                 yield [(node_iri, RDF.value, seq_value), None]
-        elif (predicate == RDF.type or predicate is None) and (obj is None or obj == VG.Node):
+        if (predicate == RDF.type or predicate is None) and (obj is None or obj == VG.Node):
             yield [(node_iri, RDF.type, VG.Node), None]
 
     def handle_to_edge_triples(self, subject: NodeIriRef, predicate: URIRef, obj: NodeIriRef):
         if predicate is None or (predicate in nodeRelatedPredicates):
-            to_node_handles = []
-            self.odgi_graph.follow_edges(subject.node_handle(), False, CollectEdges(to_node_handles))
-            node_iri = NodeIriRef(subject.node_handle(), self.base,self.odgi_graph)
-            for edge in to_node_handles:
-                other_iri = NodeIriRef(edge, self.base, self.odgi_graph)
-                if obj is None or other_iri == obj:
-                    yield from self.generate_edge_triples(edge, subject.node_handle(), node_iri, other_iri, predicate)
-
-    def generate_edge_triples(self, edge, node_handle: odgi.handle, node_iri: NodeIriRef,
-                              other_iri: NodeIriRef, predicate: URIRef):
-        node_is_reverse = self.odgi_graph.get_is_reverse(node_handle);
-        other_is_reverse = self.odgi_graph.get_is_reverse(edge)
-        # TODO: check the logic here
-        if (
-                predicate is None or VG.linksForwardToForward == predicate) and not node_is_reverse and not other_is_reverse:
-            yield [(node_iri, VG.linksForwardToForward, other_iri), None]
-        if (predicate is None or VG.linksReverseToForward == predicate) and node_is_reverse and not other_is_reverse:
-            yield [(node_iri, VG.linksReverseToForward, other_iri), None]
-        if (
-                predicate is None or VG.linksReverseToReverse == predicate) and node_is_reverse and other_is_reverse:
-            yield [(node_iri, VG.linksReverseToReverse, other_iri), None]
-        if (
-                predicate is None or VG.linksReverseToReverse == predicate) and not node_is_reverse and other_is_reverse:
-            yield [(node_iri, VG.linksForwardToReverse, other_iri), None]
-        if predicate is None or VG.links == predicate:
-            yield [(node_iri, VG.links, other_iri), None]
+            # the edges are those that leave the node, in either orientation, also when the term
+            # was made for a handle in reverse, as it is when it was found over an edge
+            node_id = self.odgi_graph.get_id(subject.node_handle())
+            other_id = None
+            if obj is not None:
+                other_id = self.node_id_of(obj)
+                if other_id is None:
+                    return
+            for node_id, orientation, edge_id in self.edges([node_id]):
+                if other_id is None or edge_id == other_id:
+                    yield from self.generate_edge_triples(node_id, orientation, edge_id, predicate)
+
+    def edge_triples(self, predicate: URIRef, obj: Node):
+        """\
+        The triples of an edge predicate with any node as subject, in one pass over the edges. With an object
+        only the edges on the sides of that node are looked at.
+        """
+        if obj is None:
+            edges = self.edges()
+        else:
+            other_id = self.node_id_of(obj)
+            if other_id is None:
+                return
+            edges = self.edges_to(other_id)
+        for node_id, orientation, other_id in edges:
+            yield from self.generate_edge_triples(node_id, orientation, other_id, predicate)
+
+    def generate_edge_triples(self, node_id: int, orientation: URIRef, other_id: int, predicate: URIRef):
+        """The triples of one edge, the orientation is one of the four vg:links... predicates"""
+        if predicate is None or orientation == predicate or VG.links == predicate:
+            node_iri = self.node_iri(self.odgi_graph.get_handle(node_id))
+            other_iri = self.node_iri(self.odgi_graph.get_handle(other_id))
+            if predicate is None or orientation == predicate:
+                yield [(node_iri, orientation, other_iri), None]
+            if predicate is None or VG.links == predicate:
+                yield [(node_iri, VG.links, other_iri), None]
+
+    def edges(self, node_ids=None):
+        """\
+        The edges as their triples are generated, as (node id, orientation, other node id), each edge once
+        as oriented_edge gives it. Those that leave the given nodes, or all edges in one pass of for_each_edge.
+        """
+        if node_ids is None:
+            collect = CollectEdges(self.odgi_graph)
+            self.odgi_graph.for_each_edge(collect)
+            yield from collect.edges()
+            return
+        orient = OrientEdges(self.odgi_graph)
+        for node_id in node_ids:
+            for edge in orient.follow(self.odgi_graph.get_handle(node_id)):
+                if edge[0] == node_id:
+                    yield edge
+
+    def edges_to(self, node_id: int):
+        """The edges of which the triples have the node as object, as (node id, orientation, node id)"""
+        orient = OrientEdges(self.odgi_graph)
+        for edge in orient.follow(self.odgi_graph.get_handle(node_id)):
+            if edge[2] == node_id:
+                yield edge
+
+    def node_id_of(self, iri: Node):
+        """The id of the node that the IRI names, None if it is not a node of this graph"""
+        if type(iri) == NodeIriRef:
+            return self.odgi_graph.get_id(iri.node_handle())
+        elif isinstance(iri, URIRef) and self.is_node_iri_in_graph(iri):
+            return int(iri.toPython().split('/')[-1])
+        return None
+
+    def linked_node_ids(self, node_id: int, predicates=edgePredicates, inverse: bool = False):
+        """\
+        The ids of the nodes that the node links to with any of the edge predicates, once for every
+        matching triple, as handle_to_edge_triples generates them. With inverse, the ids of the nodes
+        that link to this node instead.
+        """
+        links = VG.links in predicates
+        if inverse:
+            for other_id, orientation, _ in self.edges_to(node_id):
+                for _ in range(links + (orientation in predicates)):
+                    yield other_id
+        else:
+            for _, orientation, other_id in self.edges([node_id]):
+                for _ in range(links + (orientation in predicates)):
+                    yield other_id
+
+    def reachable_node_ids(self, node_ids, predicates=edgePredicates, inverse: bool = False,
+                           both_directions: bool = False, min_depth: int = 1, max_depth: int = None,
+                           depth_first: bool = False):
+        """\
+        The nodes that can be reached from the given nodes over the edges, as (node id, depth) pairs, each
+        node once. The depth is the fewest number of edges from one of the given nodes, which are at depth 0
+        unless they can only be reached again over a cycle. Nodes closer than min_depth are traversed but not
+        given, nothing further than max_depth is traversed. The edges are followed as the predicates link the
+        nodes, against that with inverse, or both ways with both_directions.
+
+        The default breadth first search finds the nodes in the order of their depth. A depth first search
+        finds the nodes of one branch before the next and gives each with the depth at which it was first found,
+        which need not be the fewest. It does go on from a node again when it finds a shorter way to it, so that
+        max_depth still limits the traversal correctly.
+        """
+        def neighbours(node_id):
+            if both_directions:
+                return chain(self.linked_node_ids(node_id, predicates, False),
+                             self.linked_node_ids(node_id, predicates, True))
+            return self.linked_node_ids(node_id, predicates, inverse)
+
+        depths = {}
+        waiting = deque()
+        for node_id in node_ids:
+            if min_depth == 0 and node_id not in depths:
+                depths[node_id] = 0
+                yield node_id, 0
+            waiting.append((node_id, 0))
+        while waiting:
+            node_id, depth = waiting.pop() if depth_first else waiting.popleft()
+            if max_depth is not None and depth >= max_depth:
+                continue
+            for other in neighbours(node_id):
+                known = depths.get(other)
+                if known is None or (depth_first and depth + 1 < known):
+                    depths[other] = depth + 1
+                    if known is None and depth + 1 >= min_depth:
+                        yield other, depth + 1
+                    waiting.append((other, depth + 1))
+
+    def neighbourhood(self, node_ids, hops: int = None, distance: int = None, both_directions: bool = True):
+        """\
+        The ids of the given nodes and of the nodes within hops edges and within distance bases of them,
+        over vg:links, both ways unless both_directions is False. The distance to a node is the number of
+        bases on the nodes in between, so the nodes next to a given node are at distance 0. Without either
+        limit only the given nodes are in it.
+        """
+        node_ids = list(node_ids)
+        for node_id in node_ids:
+            if not self.odgi_graph.has_node(node_id):
+                raise ValueError(f'no node {node_id} in the graph')
+        if distance is None:
+            if hops is None:
+                return set(node_ids)
+            return set(node_id for node_id, depth in self.reachable_node_ids(node_ids, [VG.links], False,
+                                                                              both_directions, 0, hops))
+        # the fewest bases, and the fewest edges, to each node, a node is gone over again when
+        # it is found with fewer of either, so that both limits hold
+        bases = dict((node_id, 0) for node_id in node_ids)
+        edges = dict((node_id, 0) for node_id in node_ids)
+        waiting = [(0, 0, node_id) for node_id in bases]
+        heapq.heapify(waiting)
+        while waiting:
+            node_bases, node_edges, node_id = heapq.heappop(waiting)
+            if node_bases > bases[node_id] and node_edges >= edges[node_id]:
+                continue
+            if hops is not None and node_edges >= hops:
+                continue
+            # the bases of a given node are not between it and the nodes next to it
+            other_bases = node_bases
+            if node_edges > 0:
+                other_bases = node_bases + self.odgi_graph.get_length(self.odgi_graph.get_handle(node_id))
+            if other_bases > distance:
+                continue
+            other_edges = node_edges + 1
+            others = self.linked_node_ids(node_id, [VG.links])
+            if both_directions:
+                others = chain(others, self.linked_node_ids(node_id, [VG.links], True))
+            for other in others:
+                if other_bases < bases.get(other, distance + 1) or other_edges < edges.get(other, other_edges + 1):
+                    bases[other] = min(other_bases, bases.get(other, other_bases))
+                    edges[other] = min(other_edges, edges.get(other, other_edges))
+                    heapq.heappush(waiting, (other_bases, other_edges, other))
+        return set(bases)
+
+    def subgraph(self, node_ids, hops: int = None, distance: int = None, steps: bool = True):
+        """\
+        The triples, as N-Triples terms, of the neighbourhood of the given nodes, see :meth:`neighbourhood`.
+        See :func:`spodgi.subgraph.subgraph_triples` for which triples those are.
+        """
+        from spodgi.subgraph import subgraph_triples
+        return subgraph_triples(self, self.neighbourhood(node_ids, hops, distance), steps)
+
+    def triple_count(self, predicate: URIRef = None, obj: Node = None):
+        """\
+        The exact number of triples that triples((None, predicate, obj)) generates, worked out from the
+        counts taken at open time. None if that number can not be known without generating them.
+        Per node there is a type and a value triple, and two triples per edge. Per step there are 8
+        triples, and 4 for each of its begin and end positions. Each path has a type triple.
+        """
+        statistics = self.statistics
+        steps = statistics.step_count
+        if predicate is None and obj is None:
+            return 2 * statistics.node_count + 2 * statistics.edge_count + 16 * steps + statistics.path_count
+        elif predicate == RDF.type and obj is not None:
+            if obj == VG.Node:
+                return statistics.node_count
+            elif obj == VG.Path:
+                return statistics.path_count
+            elif obj == VG.Step or obj == FALDO.Region:
+                return steps
+            elif obj == FALDO.ExactPosition or obj == FALDO.Position:
+                return 2 * steps
+            elif obj in knownTypes:
+                return None
+            return 0
+        elif obj is not None:
+            return None
+        elif predicate == RDF.value:
+            return statistics.node_count
+        elif predicate == VG.links:
+            return statistics.edge_count
+        elif predicate in (VG.rank, VG.position, VG.path, FALDO.begin, FALDO.end):
+            return steps
+        elif predicate == FALDO.position or predicate == FALDO.reference:
+            return 2 * steps
+        return None
+
+    def __len__(self, context=None):
+        return self.triple_count()
+
+    def cardinality(self, triple_pattern, bound=(False, False, False)):
+        """\
+        An estimate of the number of triples that match the pattern. A None in the pattern for which
+        bound is True is a variable that an earlier pattern binds, to a value that is not known yet.
+        """
+        subject, predicate, obj = triple_pattern
+        subject_bound = subject is not None or bound[0]
+        obj_bound = obj is not None or bound[2]
+        statistics = self.statistics
+        nodes = statistics.node_count
+        steps = statistics.step_count
+        paths = max(statistics.path_count, 1)
+        if not subject_bound and not bound[1] and \
+                (not obj_bound or (predicate == RDF.type and isinstance(obj, URIRef))):
+            count = self.triple_count(predicate, obj)
+            if count is not None:
+                return count
+        if subject_bound and obj_bound:
+            return 1
+        if predicate is None:
+            if bound[1]:
+                # one of the predicates, each about as common as the others
+                return max(1, self.cardinality((subject, None, obj), (bound[0], False, bound[2])) //
+                           (len(knownPredicates) + 1))
+            return 16
+        if not isinstance(predicate, URIRef):
+            # property paths, we can not do better than all edges
+            return statistics.edge_count
+        if predicate == RDF.type:
+            if subject_bound:
+                return 3
+            if obj == VG.Node:
+                return nodes
+            elif obj == VG.Path:
+                return statistics.path_count
+            elif obj == VG.Step or obj == FALDO.Region:
+                return steps
+            elif obj == FALDO.ExactPosition or obj == FALDO.Position:
+                return 2 * steps
+            return nodes + statistics.path_count + 6 * steps
+        if predicate == RDF.value:
+            return 1 if subject_bound or obj_bound else nodes
+        if predicate in (VG.links, VG.linksForwardToForward, VG.linksForwardToReverse,
+                         VG.linksReverseToForward, VG.linksReverseToReverse):
+            if subject_bound or obj_bound:
+                return max(1, statistics.edge_count // max(nodes, 1))
+            return statistics.edge_count
+        if predicate == VG.node or predicate == VG.reverseOfNode:
+            if subject_bound:
+                return 1
+            elif obj_bound:
+                return max(1, round(statistics.average_node_depth()))
+            return steps
+        if predicate == VG.path:
+            if subject_bound:
+                return 1
+            elif obj_bound:
+                return max(1, steps // paths)
+            return steps
+        if predicate in (VG.rank, VG.position, FALDO.begin, FALDO.end):
+            if subject_bound:
+                return 1
+            elif obj_bound:
+                return paths
+            return steps
+        if predicate == FALDO.position:
+            if subject_bound:
+                return 1
+            elif obj_bound:
+                return 2 * paths
+            return 2 * steps
+        if predicate == FALDO.reference:
+            if subject_bound:
+                return 1
+            elif obj_bound:
+                return max(1, 2 * steps // paths)
+            return 2 * steps
+        if predicate == RDFS.label:
+            return 1 if subject_bound else statistics.path_count
+        return 0
+
+    def void_description(self):
+        """A VoID description of the graph, with the counts of the classes and properties"""
+        void = Graph()
+        void.bind('void', VOID)
+        void.bind('vg', VG)
+        void.bind('faldo', FALDO)
+        dataset = URIRef(self.base)
+        void.add((dataset, RDF.type, VOID.Dataset))
+        void.add((dataset, VOID.triples, Literal(self.cardinality((None, None, None)))))
+        void.add((dataset, VOID.classes, Literal(len(knownTypes))))
+        void.add((dataset, VOID.properties, Literal(len(knownPredicates) + 1)))
+        for typ in knownTypes:
+            if typ == FALDO.ExactPosition or typ == FALDO.Position:
+                # the end of a step is the begin of the next step on its path
+                entities = self.statistics.step_count + self.statistics.path_count
+            else:
+                entities = self.cardinality((None, RDF.type, typ))
+            partition = BNode()
+            void.add((dataset, VOID.classPartition, partition))
+            void.add((partition, VOID['class'], typ))
+            void.add((partition, VOID.entities, Literal(entities)))
+        for predicate in [RDF.type] + knownPredicates:
+            partition = BNode()
+            void.add((dataset, VOID.propertyPartition, partition))
+            void.add((partition, VOID.property, predicate))
+            void.add((partition, VOID.triples, Literal(self.cardinality((None, predicate, None)))))
+        return void
 
     def bind(self, prefix, namespace):
         self.namespace_manager.bind(prefix, namespace)
@@ -386,19 +899,141 @@ class OdgiStore(Store):
     def namespaces(self):
         return self.namespace_manager.namespaces()
 
-    def handles(self):
-        node_id = self.odgi_graph.min_node_id()
+    def node_ids(self):
+        """The ids of the nodes in ascending order, see :class:`NodeIds`, collected on first use"""
+        if self.nodeIds is None:
+            self.nodeIds = NodeIds(self.odgi_graph)
+        return self.nodeIds
 
-        max_node_id = self.odgi_graph.max_node_id()
-        while node_id <= max_node_id:
-            if self.odgi_graph.has_node(node_id):
-                node_id = node_id + 1
-                yield self.odgi_graph.get_handle(node_id - 1)
+    def node_lengths(self):
+        """The sequence lengths of the nodes, see :class:`NodeLengths`, collected on first use"""
+        if self.nodeLengths is None:
+            self.nodeLengths = NodeLengths(self.odgi_graph, self.node_ids())
+        return self.nodeLengths
+
+    def nodes_with_length(self, min_length: int = None, max_length: int = None):
+        """The nodes with a sequence length within the (inclusive) bounds, in id order"""
+        get_handle = self.odgi_graph.get_handle
+        for node_id in self.node_lengths().node_ids_between(min_length, max_length):
+            yield self.node_iri(get_handle(node_id))
+
+    def node_ids_with_sequence(self, min_length: int = None, max_length: int = None, motifs=()):
+        """\
+        The ids, in ascending order, of the nodes of which the sequence may have a length within the (inclusive)
+        bounds and may contain each of the motifs, where a motif is given as the list of its alternative literals.
+        The lengths come from the length index, the motifs from the k-mer index if there is one. None if neither
+        narrows the nodes down.
+        """
+        candidates = None
+        if self.kmerIndex is not None:
+            for alternatives in motifs:
+                node_ids = self.kmerIndex.candidates(alternatives)
+                if node_ids is not None:
+                    candidates = set(node_ids) if candidates is None else candidates.intersection(node_ids)
+        if min_length is None and max_length is None:
+            return None if candidates is None else sorted(candidates)
+        node_ids = self.node_lengths().node_ids_between(min_length, max_length)
+        if candidates is None:
+            return node_ids
+        return [node_id for node_id in node_ids if node_id in candidates]
+
+    def handles(self):
+        """The handles of the nodes, in forward orientation and in id order"""
+        get_handle = self.odgi_graph.get_handle
+        for node_id in self.node_ids():
+            yield get_handle(node_id)
 
     def find_path_iri_by_handle(self, path_handle: odgi.path_handle):
-        for p in self.knownPaths:
-            if p.path() == path_handle:
-                return p
-            elif self.odgi_graph.get_path_name(p.path()) == self.odgi_graph.get_path_name(path_handle):
-                return p
-        raise Exception("no path handle known "+str(path_handle))
\ No newline at end of file
+        path_iri = self.path_named(self.odgi_graph.get_path_name(path_handle))
+        if path_iri is None:
+            raise Exception("no path handle known " + str(path_handle))
+        return path_iri
+
+    def node_iri(self, node_handle: odgi.handle):
+        """The shared NodeIriRef of a node handle, keyed by node id and orientation"""
+        key = (self.odgi_graph.get_id(node_handle), self.odgi_graph.get_is_reverse(node_handle))
+        node_iri = self.terms.get(key)
+        if node_iri is None:
+            node_iri = NodeIriRef(node_handle, self.base, self.odgi_graph)
+            self.terms.put(key, node_iri)
+        return node_iri
+
+    def step_iri(self, step_handle: odgi.step_handle, path_iri: PathIriRef, rank: int, position: int):
+        """The shared StepIriRef of a step, keyed by path and rank"""
+        if path_iri is None:
+            return StepIriRef(step_handle, self.base, self.odgi_graph, position, rank)
+        key = (path_iri.unicode(), rank)
+        step_iri = self.terms.get(key)
+        if step_iri is None:
+            step_iri = StepIriRef(step_handle, self.base, self.odgi_graph, position, rank, path_iri)
+            self.terms.put(key, step_iri)
+        return step_iri
+
+    def step_begin(self, step_iri: StepIriRef):
+        key = ('begin', step_iri.unicode())
+        begin = self.terms.get(key)
+        if begin is None:
+            begin = StepBeginIriRef(step_iri)
+            self.terms.put(key, begin)
+        return begin
+
+    def step_end(self, step_iri: StepIriRef):
+        key = ('end', step_iri.unicode())
+        end = self.terms.get(key)
+        if end is None:
+            end = StepEndIriRef(step_iri)
+            self.terms.put(key, end)
+        return end
+
+    def path_iri_of_step(self, step_iri: StepIriRef):
+        path_iri = step_iri.path_iri()
+        if path_iri is None:
+            path_iri = self.find_path_iri_by_handle(step_iri.path())
+        return path_iri
+
+    def all_paths(self):
+        """The paths in the order in which odgi lists them, all collected on first use"""
+        if not self.allPaths:
+            paths_by_name = {}
+            paths_by_iri = {}
+            collect_paths = CollectPaths(paths_by_name, paths_by_iri, self.odgi_graph, self.base)
+            if self.sidecar is None:
+                self.odgi_graph.for_each_path_handle(collect_paths)
+            else:
+                for name in self.sidecar.path_names():
+                    collect_paths(self.odgi_graph.get_path_handle(name))
+            self.pathsByName = paths_by_name
+            self.pathsByIri = paths_by_iri
+            self.allPaths = True
+        return self.pathsByName.values()
+
+    def path_named(self, name: str):
+        """The PathIriRef of the path with the name, looked up in odgi the first time, None if there is no such path"""
+        path_iri = self.pathsByName.get(name)
+        if path_iri is None and not self.allPaths and self.odgi_graph.has_path(name):
+            CollectPaths(self.pathsByName, self.pathsByIri, self.odgi_graph, self.base)(
+                self.odgi_graph.get_path_handle(name))
+            path_iri = self.pathsByName[name]
+        return path_iri
+
+    def matching_paths(self, path: Identifier):
+        """All paths if path is None, otherwise the path with that IRI if it is known"""
+        if path is None:
+            return self.all_paths()
+        elif not isinstance(path, URIRef):
+            return []
+        path_iri = self.pathsByIri.get(str(path))
+        if path_iri is None and not self.allPaths:
+            # a path named by an IRI has that IRI, the others have one below the base
+            prefix = f'{self.base}path/'
+            names = [str(path)]
+            if str(path).startswith(prefix):
+                names.append(str(path)[len(prefix):])
+            for name in names:
+                path_iri = self.path_named(name)
+                if path_iri is not None and path_iri.unicode() == str(path):
+                    break
+                path_iri = None
+        if path_iri is None:
+            return []
+        return [path_iri]
@@ -0,0 +1,75 @@
+"""
+This module defines the bounded caches used by the store.
+
+* :class:`Least recently used cache <LruCache>`
+"""
+
+from collections import OrderedDict
+from threading import Lock
+
+__all__ = [
+    'LruCache'
+]
+
+
+class LruCache:
+    """\
+    A dictionary that forgets the least recently used entry once it holds more than max_entries,
+    or, if max_bytes is given, once the sizes given with the entries add up to more than max_bytes.
+    It counts its hits, misses and evictions.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._lock = Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._entries.get(key, default)
+            if value is default:
+                self.misses = self.misses + 1
+            else:
+                self.hits = self.hits + 1
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value, size: int = 0):
+        if self.max_entries <= 0 or (self.max_bytes is not None and size > self.max_bytes):
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if self.max_bytes is not None:
+                self.bytes = self.bytes - self._sizes.get(key, 0) + size
+                self._sizes[key] = size
+            while len(self._entries) > self.max_entries or (self.max_bytes is not None and self.bytes > self.max_bytes):
+                evicted, _ = self._entries.popitem(last=False)
+                if self.max_bytes is not None:
+                    self.bytes = self.bytes - self._sizes.pop(evicted)
+                self.evictions = self.evictions + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def stats(self):
+        stats = {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                 'evictions': self.evictions}
+        if self.max_bytes is not None:
+            stats['bytes'] = self.bytes
+        return stats
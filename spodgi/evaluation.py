@@ -0,0 +1,408 @@
+"""
+Evaluation of parts of the SPARQL algebra that the OdgiStore can answer from its indexes,
+instead of rdflib joining the results of triples() one pattern at a time.
+
+:func:`evaluate` is registered in rdflib's CUSTOM_EVALS. For every part it does not
+recognise it raises NotImplementedError, after which rdflib evaluates that part as usual.
+"""
+
+from rdflib.namespace import RDF
+from rdflib.paths import SequencePath
+from rdflib.plugins.sparql import CUSTOM_EVALS
+from rdflib.plugins.sparql.evaluate import evalBGP
+from rdflib.plugins.sparql.evalutils import _ebv
+from rdflib.plugins.sparql.parserutils import CompValue
+from rdflib.plugins.sparql.sparql import AlreadyBound, FrozenBindings
+from rdflib.term import BNode, Literal, Variable
+from spodgi.OdgiStore import OdgiStore, VG, FALDO
+from spodgi.kmers import motif_alternatives
+from spodgi.traversal import edge_path
+
+__all__ = ['evaluate']
+
+
+def evaluate(ctx, part):
+    store = getattr(ctx.graph, 'store', None)
+    if not isinstance(store, OdgiStore):
+        raise NotImplementedError()
+
+    if part.name == 'Filter' and part.p is not None and part.p.name == 'BGP':
+        position_range = find_position_range(ctx, part)
+        if position_range is not None:
+            return evaluate_position_range(ctx, part, store, position_range)
+        sequence_filter = find_sequence_filter(ctx, part, store)
+        if sequence_filter is not None:
+            return evaluate_sequence_filter(ctx, part, store, *sequence_filter)
+    elif part.name == 'BGP':
+        triples, traversals = with_edge_paths(part.triples)
+        step_star = find_step_star(ctx, triples)
+        if step_star is not None:
+            return evaluate_step_star(ctx, triples, store, *step_star)
+        elif len(triples) > 1:
+            return evalBGP(ctx, order_by_cardinality(ctx, store, triples))
+        elif traversals:
+            return evalBGP(ctx, triples)
+    elif part.name == 'AggregateJoin':
+        count = count_single_pattern(ctx, part, store)
+        if count is not None:
+            return iter([FrozenBindings(ctx, {part.A[0].res: Literal(count)})])
+    raise NotImplementedError()
+
+
+class PositionRange:
+    """The bounds on the begin and end positions of the steps bound to one variable"""
+
+    def __init__(self, step):
+        self.step = step
+        self.path = None
+        self.begin_min = None
+        self.begin_max = None
+        self.end_min = None
+        self.end_max = None
+
+    def is_bounded(self):
+        return not (self.begin_min is None and self.begin_max is None and
+                    self.end_min is None and self.end_max is None)
+
+
+def find_position_range(ctx, part):
+    """\
+    Recognises a filter on the faldo:begin/faldo:position or faldo:end/faldo:position of a step.
+    For example ?step faldo:begin/faldo:position ?b . FILTER(?b >= 100 && ?b <= 200)
+    """
+    triples = part.p.triples
+    begins = position_variables(triples, FALDO.begin)
+    ends = position_variables(triples, FALDO.end)
+    if not begins and not ends:
+        return None
+
+    bounds = {}
+    for constraint in conjuncts(part.expr):
+        add_bound(constraint, bounds)
+
+    for step in set(begins.values()) | set(ends.values()):
+        if ctx[step] is not None:
+            continue
+        position_range = PositionRange(step)
+        for variable, (low, high) in bounds.items():
+            if begins.get(variable) == step:
+                position_range.begin_min = highest(position_range.begin_min, low)
+                position_range.begin_max = lowest(position_range.begin_max, high)
+            if ends.get(variable) == step:
+                position_range.end_min = highest(position_range.end_min, low)
+                position_range.end_max = lowest(position_range.end_max, high)
+        if position_range.is_bounded():
+            position_range.path = find_path(ctx, triples, step)
+            return position_range
+    return None
+
+
+def position_variables(triples, begin_or_end):
+    """Maps the variables holding the begin (or end) position of a step to the variable of that step"""
+    found = {}
+    for s, p, o in triples:
+        if not isinstance(s, Variable) or not isinstance(o, Variable):
+            continue
+        if isinstance(p, SequencePath) and list(p.args) == [begin_or_end, FALDO.position]:
+            found[o] = s
+        elif p == begin_or_end:
+            for ps, pp, po in triples:
+                if ps == o and pp == FALDO.position and isinstance(po, Variable):
+                    found[po] = s
+    return found
+
+
+def find_path(ctx, triples, step):
+    """The path the step is on, if the pattern gives it via vg:path or faldo:reference"""
+    positions = set(o for s, p, o in triples if s == step and (p == FALDO.begin or p == FALDO.end))
+    for s, p, o in triples:
+        if (s == step and p == VG.path) or (s in positions and p == FALDO.reference):
+            if ctx[o] is not None:
+                return ctx[o]
+    return None
+
+
+def conjuncts(expr):
+    if isinstance(expr, CompValue) and expr.name == 'ConditionalAndExpression':
+        yield from conjuncts(expr.expr)
+        for other in expr.other:
+            yield from conjuncts(other)
+    else:
+        yield expr
+
+
+flipped_operators = {'<': '>', '<=': '>=', '>': '<', '>=': '<=', '=': '='}
+
+
+def variable_of(expr):
+    return expr if isinstance(expr, Variable) else None
+
+
+def strlen_variable_of(expr):
+    """The variable in STRLEN(?var)"""
+    if isinstance(expr, CompValue) and expr.name == 'Builtin_STRLEN' and isinstance(expr.arg, Variable):
+        return expr.arg
+    return None
+
+
+def add_bound(expr, bounds, operand=variable_of):
+    """\
+    Adds the inclusive integer bound that a comparison of a variable with a literal gives. The
+    operand picks the variable out of one side of the comparison, by default the side is the variable.
+    """
+    if not isinstance(expr, CompValue) or expr.name != 'RelationalExpression' or expr.op not in flipped_operators:
+        return
+    variable, op, value = operand(expr.expr), expr.op, expr.other
+    if variable is None:
+        variable, op, value = operand(expr.other), flipped_operators[op], expr.expr
+    if variable is None or not isinstance(value, Literal):
+        return
+    value = value.toPython()
+    if type(value) != int:
+        return
+
+    low, high = bounds.get(variable, (None, None))
+    if op == '>':
+        low = highest(low, value + 1)
+    elif op == '>=' or op == '=':
+        low = highest(low, value)
+    if op == '<':
+        high = lowest(high, value - 1)
+    elif op == '<=' or op == '=':
+        high = lowest(high, value)
+    bounds[variable] = (low, high)
+
+
+def highest(a, b):
+    if a is None:
+        return b
+    elif b is None:
+        return a
+    return max(a, b)
+
+
+def lowest(a, b):
+    if a is None:
+        return b
+    elif b is None:
+        return a
+    return min(a, b)
+
+
+def evaluate_position_range(ctx, part, store, position_range):
+    """\
+    Binds the step variable to only the steps within the position range, and then evaluates
+    the basic graph pattern and the filter for each of them as rdflib would.
+    """
+    steps = store.steps_between(position_range.path, position_range.begin_min, position_range.begin_max,
+                                position_range.end_min, position_range.end_max)
+    return evaluate_filter_for_each(ctx, part, position_range.step, steps)
+
+
+def add_motif(expr, motifs):
+    """\
+    Adds the alternative literals of which a match of a REGEX, CONTAINS, STRSTARTS or STRENDS on a variable
+    contains one, if the index can use them: a literal, or a regex that is a simple motif without flags.
+    """
+    if not isinstance(expr, CompValue):
+        return
+    if expr.name == 'Builtin_REGEX':
+        variable, pattern = expr.text, expr.pattern
+        if expr.flags is not None or not isinstance(pattern, Literal):
+            return
+        alternatives = motif_alternatives(str(pattern))
+    elif expr.name in ('Builtin_CONTAINS', 'Builtin_STRSTARTS', 'Builtin_STRENDS'):
+        variable, literal = expr.arg1, expr.arg2
+        if not isinstance(literal, Literal):
+            return
+        alternatives = [str(literal)]
+    else:
+        return
+    if isinstance(variable, Variable) and alternatives is not None:
+        motifs.setdefault(variable, []).append(alternatives)
+
+
+def find_sequence_filter(ctx, part, store):
+    """\
+    Recognises a filter on the sequence of a node that the indexes of the store can narrow down, such as
+    ?node rdf:value ?seq . FILTER(strlen(?seq) > 5 && regex(?seq, '[AT]AAT')). Gives the node variable and
+    the ids of the nodes that may pass the filter.
+    """
+    bounds = {}
+    motifs = {}
+    for constraint in conjuncts(part.expr):
+        add_bound(constraint, bounds, strlen_variable_of)
+        add_motif(constraint, motifs)
+    if not bounds and not motifs:
+        return None
+    for s, p, o in part.p.triples:
+        if p == RDF.value and isinstance(s, Variable) and ctx[s] is None and isinstance(o, Variable) \
+                and ctx[o] is None and s != o and (o in bounds or o in motifs):
+            node_ids = store.node_ids_with_sequence(*bounds.get(o, (None, None)), motifs.get(o, ()))
+            if node_ids is not None:
+                return s, node_ids
+    return None
+
+
+def evaluate_sequence_filter(ctx, part, store, node, node_ids):
+    """\
+    Binds the node variable to only the nodes that the indexes of the store found, so that no other
+    sequence is read. Then evaluates the basic graph pattern and the filter for each of them as rdflib would.
+    """
+    get_handle = store.odgi_graph.get_handle
+    nodes = (store.node_iri(get_handle(node_id)) for node_id in node_ids)
+    return evaluate_filter_for_each(ctx, part, node, nodes)
+
+
+def evaluate_filter_for_each(ctx, part, variable, values):
+    """The solutions of the basic graph pattern and filter of the part with the variable bound to each value"""
+    for value in values:
+        c = ctx.push()
+        c[variable] = value
+        triples = sorted(part.p.triples, key=lambda t: len([n for n in t if c[n] is None]))
+        for solution in evalBGP(c, triples):
+            if _ebv(part.expr, solution.forget(ctx, _except=part._vars) if not part.no_isolated_scope else solution):
+                yield solution
+
+
+step_star_predicates = [VG.node, VG.reverseOfNode, VG.path, VG.rank, VG.position]
+
+
+def is_step_triple(triple):
+    s, p, o = triple
+    return p in step_star_predicates or (p == RDF.type and (o == VG.Step or o == FALDO.Region))
+
+
+def find_step_star(ctx, triples):
+    """\
+    Finds an unbound variable that is the subject of more than one step triple, and of nothing else.
+    For example ?step vg:node ?n ; vg:path ?p ; vg:rank ?r ; vg:position ?pos
+    """
+    subjects = []
+    for s, p, o in triples:
+        if isinstance(s, Variable) and ctx[s] is None and s not in subjects:
+            subjects.append(s)
+    for subject in subjects:
+        star = [t for t in triples if t[0] == subject]
+        if len(star) > 1 and all(is_step_triple(t) for t in star):
+            return subject, star
+    return None
+
+
+def evaluate_step_star(ctx, triples, store, subject, star):
+    """\
+    Binds all variables of the star from one pass over the step table of the store, instead of
+    a call of triples() per pattern and partial solution. The rest of the pattern is evaluated
+    by rdflib for each step.
+    """
+    path = None
+    node = None
+    for s, p, o in star:
+        if p == VG.path and ctx[o] is not None:
+            path = ctx[o]
+        elif (p == VG.node or p == VG.reverseOfNode) and ctx[o] is not None:
+            node = ctx[o]
+    rest = [t for t in triples if t not in star]
+
+    for step_iri, node_iri, is_reverse, path_iri, rank, position in store.step_table(path, node):
+        values = {VG.node: None if is_reverse else node_iri,
+                  VG.reverseOfNode: node_iri if is_reverse else None,
+                  VG.path: path_iri,
+                  VG.rank: Literal(rank),
+                  VG.position: Literal(position)}
+        c = ctx.push()
+        c[subject] = step_iri
+        if bind_star(c, star, values):
+            yield from evalBGP(c, sorted(rest, key=lambda t: len([n for n in t if c[n] is None])))
+
+
+def bind_star(c, star, values):
+    for s, p, o in star:
+        if p == RDF.type:
+            continue
+        value = values[p]
+        if value is None:
+            return False
+        bound = c[o]
+        if bound is None:
+            try:
+                c[o] = value
+            except AlreadyBound:
+                return False
+        elif bound != value:
+            return False
+    return True
+
+
+def with_edge_paths(triples):
+    """\
+    The triples with each property path over the edges replaced by an EdgePath, which evaluates it
+    by a traversal of the odgi graph, and whether there were any such paths
+    """
+    replaced = []
+    traversals = False
+    for s, p, o in triples:
+        path = edge_path(p)
+        if path is not None:
+            p = path
+            traversals = True
+        replaced.append((s, p, o))
+    return replaced, traversals
+
+
+def order_by_cardinality(ctx, store, triples):
+    """\
+    Orders the triple patterns so that the pattern with the fewest estimated matches goes first,
+    given the variables that the patterns before it have bound.
+    """
+    bound = set()
+    ordered = []
+    remaining = list(triples)
+    while remaining:
+        best = min(remaining, key=lambda t: store.cardinality(*planned_pattern(ctx, t, bound)))
+        remaining.remove(best)
+        ordered.append(best)
+        bound.update(n for n in best if isinstance(n, (Variable, BNode)))
+    return ordered
+
+
+def planned_pattern(ctx, triple, bound):
+    """\
+    The triple with None for the variables that are unbound, and which of those a pattern before binds,
+    as store.cardinality takes them
+    """
+    pattern = tuple(ctx[n] for n in triple)
+    return pattern, tuple(value is None and n in bound for n, value in zip(triple, pattern))
+
+
+def count_single_pattern(ctx, part, store):
+    """\
+    The answer of a COUNT over a single triple pattern without GROUP BY, such as
+    SELECT (COUNT(*) AS ?c) WHERE {?s a vg:Step}, from the counts kept by the store.
+    None if the store can not know the count without generating the triples.
+    """
+    if len(part.A) != 1 or part.A[0].name != 'Aggregate_Count' or part.A[0].distinct:
+        return None
+    group = part.p
+    if group.name != 'Group' or group.expr is not None or group.p.name != 'BGP' or len(group.p.triples) != 1:
+        return None
+    s, p, o = group.p.triples[0]
+    if not isinstance(s, Variable) or ctx[s] is not None or s == o or s == p:
+        return None
+    if isinstance(p, Variable):
+        if ctx[p] is not None or p == o:
+            return None
+        p = None
+    if isinstance(o, Variable):
+        if ctx[o] is not None:
+            return None
+        o = None
+    elif p is None:
+        return None
+    counted = part.A[0].vars
+    if counted != '*' and counted not in group.p.triples[0]:
+        return None
+    return store.triple_count(p, o)
+
+
+CUSTOM_EVALS['spodgi'] = evaluate
@@ -0,0 +1,469 @@
+"""
+Streaming export of an odgi graph as N-Triples or Turtle.
+
+The triples are the same as those of a full scan of the OdgiStore, in the same order:
+the nodes with their edges, then the steps of each path, then the paths. They are
+written straight from the odgi handles as text, without building rdflib terms, so the
+memory used does not grow with the size of the graph.
+
+The output can be compressed with gzip, xz or zstd (the latter needs the zstandard
+package), and can roll over to a new chunk file every so many triples.
+
+The work can be split into shards, runs of nodes and single paths, that a pool of
+processes writes to separate files. N-Triples shards can be concatenated as they are,
+each Turtle shard repeats the prefixes and is a document on its own. Compressed shards
+can be concatenated too, as gzip, xz and zstd all read a series of streams as one.
+"""
+
+import gzip
+import lzma
+import os
+import shutil
+import sys
+import tempfile
+from multiprocessing import Pool
+from rdflib.namespace import RDF, XSD
+import odgi
+from spodgi.OdgiStore import VG, FALDO, OrientEdges
+from spodgi.index import NodeIds
+from spodgi.term import iri_path_name, step_prefix, position_prefix
+
+__all__ = [
+    'ChunkedWriter',
+    'NTriplesWriter',
+    'Output',
+    'TurtleWriter',
+    'compression_of',
+    'export',
+    'write_graph'
+]
+
+DEFAULT_BUFFER_SIZE = 16 * 1024 * 1024
+
+compression_suffixes = {'gzip': '.gz', 'xz': '.xz', 'zstd': '.zst'}
+
+
+class CollectPathNames:
+    def __init__(self, odgi_graph: odgi, names):
+        self.odgi_graph = odgi_graph
+        self.names = names
+
+    def __call__(self, path_handle):
+        self.names.append(self.odgi_graph.get_path_name(path_handle))
+
+
+def compression_of(file_name: str):
+    """The compression that the suffix of the file name asks for, None if it is not compressed"""
+    for compression, suffix in compression_suffixes.items():
+        if file_name.endswith(suffix):
+            return compression
+    return None
+
+
+def numbered(file_name: str, number: int):
+    """The file name with a number before its extensions, graph.nt.gz becomes graph.00001.nt.gz"""
+    stem = file_name
+    suffix = ''
+    compression = compression_of(file_name)
+    if compression is not None:
+        stem = stem[:-len(compression_suffixes[compression])]
+        suffix = compression_suffixes[compression]
+    stem, extension = os.path.splitext(stem)
+    return f'{stem}.{number:05d}{extension}{suffix}'
+
+
+class Output:
+    """\
+    A text file, or standard out for '-', that is compressed as it is written. The text is
+    collected until about buffer_size characters are waiting, which are then encoded,
+    compressed and written in one go.
+    """
+
+    def __init__(self, file_name: str, compression: str = None, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        self.file_name = file_name
+        self.buffer_size = buffer_size
+        self._pending = []
+        self._size = 0
+        if file_name == '-':
+            self._file = sys.stdout.buffer
+        else:
+            self._file = open(file_name, 'wb')
+        if compression is None:
+            self._stream = self._file
+        elif compression == 'gzip':
+            self._stream = gzip.GzipFile(fileobj=self._file, mode='wb', compresslevel=6)
+        elif compression == 'xz':
+            self._stream = lzma.LZMAFile(self._file, 'wb', preset=6)
+        elif compression == 'zstd':
+            try:
+                import zstandard
+            except ImportError:
+                raise ValueError('zstd compression needs the zstandard package')
+            self._stream = zstandard.ZstdCompressor(level=3).stream_writer(self._file, closefd=False)
+        else:
+            raise ValueError(f'Unknown compression {compression}')
+
+    def write(self, text: str):
+        self._pending.append(text)
+        self._size = self._size + len(text)
+        if self._size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            self._stream.write(''.join(self._pending).encode('utf-8'))
+            self._pending.clear()
+            self._size = 0
+
+    def close(self):
+        self.flush()
+        if self._stream is not self._file:
+            self._stream.close()
+        if self._file is sys.stdout.buffer:
+            self._file.flush()
+        else:
+            self._file.close()
+
+
+class NTriplesWriter:
+    """Writes triples, given as N-Triples terms, one per line"""
+    extension = 'nt'
+
+    def __init__(self, out):
+        self.out = out
+
+    def triple(self, s: str, p: str, o: str):
+        self.out.write(f'{s} {p} {o} .\n')
+
+    def close(self):
+        pass
+
+
+class TurtleWriter:
+    """\
+    Writes triples, given as N-Triples terms, as Turtle. IRIs are shortened with the prefixes where
+    the rest of the IRI is a simple local name, and consecutive triples of a subject are grouped.
+    """
+    extension = 'ttl'
+
+    def __init__(self, out, prefixes):
+        self.out = out
+        self.prefixes = sorted(prefixes.items(), key=lambda item: len(item[1]), reverse=True)
+        self.subject = None
+        for prefix, namespace in prefixes.items():
+            out.write(f'@prefix {prefix}: <{namespace}> .\n')
+
+    def shorten(self, term: str):
+        if not term.startswith('<'):
+            return term
+        iri = term[1:-1]
+        for prefix, namespace in self.prefixes:
+            if iri.startswith(namespace):
+                local = iri[len(namespace):]
+                if local and (local.isalnum() or local.replace('_', '').replace('-', '').isalnum()):
+                    return f'{prefix}:{local}'
+        return term
+
+    def triple(self, s: str, p: str, o: str):
+        if p == rdf_type:
+            p = 'a'
+        else:
+            p = self.shorten(p)
+        if s == self.subject:
+            self.out.write(f' ;\n    {p} {self.shorten(o)}')
+        else:
+            if self.subject is not None:
+                self.out.write(' .\n')
+            self.subject = s
+            self.out.write(f'{self.shorten(s)} {p} {self.shorten(o)}')
+
+    def close(self):
+        if self.subject is not None:
+            self.out.write(' .\n')
+            self.subject = None
+
+
+def iri(value: str):
+    return f'<{value}>'
+
+
+def integer(value: int):
+    return f'"{value}"^^<{XSD.integer}>'
+
+
+rdf_type = iri(RDF.type)
+rdf_value = iri(RDF.value)
+vg_node_type = iri(VG.Node)
+vg_path_type = iri(VG.Path)
+vg_step_type = iri(VG.Step)
+vg_links = iri(VG.links)
+vg_f2f = iri(VG.linksForwardToForward)
+vg_f2r = iri(VG.linksForwardToReverse)
+vg_r2f = iri(VG.linksReverseToForward)
+vg_r2r = iri(VG.linksReverseToReverse)
+vg_node = iri(VG.node)
+vg_reverse_of_node = iri(VG.reverseOfNode)
+vg_rank = iri(VG.rank)
+vg_position = iri(VG.position)
+vg_path = iri(VG.path)
+faldo_region = iri(FALDO.Region)
+faldo_exact_position = iri(FALDO.ExactPosition)
+faldo_position_type = iri(FALDO.Position)
+faldo_begin = iri(FALDO.begin)
+faldo_end = iri(FALDO.end)
+faldo_position = iri(FALDO.position)
+faldo_reference = iri(FALDO.reference)
+orientations = {VG.linksForwardToForward: vg_f2f, VG.linksForwardToReverse: vg_f2r,
+                VG.linksReverseToForward: vg_r2f, VG.linksReverseToReverse: vg_r2r}
+
+
+def path_iri(path_name: str, base: str):
+    if iri_path_name.match(path_name):
+        return path_name
+    return f'{base}path/{path_name}'
+
+
+def write_node(odgi_graph: odgi, base: str, writer, handle: odgi.handle, orient: OrientEdges, linked_to=None):
+    """The triples of one node and of the edges that leave it, only those to nodes in linked_to if that is given"""
+    node_id = odgi_graph.get_id(handle)
+    node = f'<{base}node/{node_id}>'
+    writer.triple(node, rdf_type, vg_node_type)
+    writer.triple(node, rdf_value, f'"{odgi_graph.get_sequence(handle)}"')
+    for edge_id, orientation, other_id in orient.follow(handle):
+        if edge_id != node_id or (linked_to is not None and other_id not in linked_to):
+            continue
+        other = f'<{base}node/{other_id}>'
+        writer.triple(node, orientations[orientation], other)
+        writer.triple(node, vg_links, other)
+
+
+def write_nodes(odgi_graph: odgi, base: str, writer, node_ids):
+    """The triples of the nodes with the given ids, and of their edges"""
+    orient = OrientEdges(odgi_graph)
+    for node_id in node_ids:
+        write_node(odgi_graph, base, writer, odgi_graph.get_handle(node_id), orient)
+
+
+def write_position(writer, position_iri: str, position: int, path: str):
+    writer.triple(position_iri, faldo_position, integer(position))
+    writer.triple(position_iri, rdf_type, faldo_exact_position)
+    writer.triple(position_iri, rdf_type, faldo_position_type)
+    writer.triple(position_iri, faldo_reference, path)
+
+
+def write_step(odgi_graph: odgi, base: str, writer, node_handle: odgi.handle, path: str, steps: str,
+               positions: str, rank: int, position: int):
+    """The triples of one step, and of its begin and end positions. Returns the position at its end."""
+    end = position + odgi_graph.get_length(node_handle)
+    step = f'<{steps}{rank}>'
+    begin_iri = f'<{positions}{position}>'
+    end_iri = f'<{positions}{end}>'
+    writer.triple(step, rdf_type, vg_step_type)
+    writer.triple(step, rdf_type, faldo_region)
+    node = f'<{base}node/{odgi_graph.get_id(node_handle)}>'
+    if odgi_graph.get_is_reverse(node_handle):
+        writer.triple(step, vg_reverse_of_node, node)
+    else:
+        writer.triple(step, vg_node, node)
+    writer.triple(step, vg_rank, integer(rank))
+    writer.triple(step, vg_position, integer(position))
+    writer.triple(step, vg_path, path)
+    writer.triple(step, faldo_begin, begin_iri)
+    writer.triple(step, faldo_end, end_iri)
+    write_position(writer, begin_iri, position, path)
+    write_position(writer, end_iri, end, path)
+    return end
+
+
+def write_path_steps(odgi_graph: odgi, base: str, writer, path_name: str):
+    """The triples of the steps of one path, and of their begin and end positions"""
+    path_handle = odgi_graph.get_path_handle(path_name)
+    if odgi_graph.is_empty(path_handle):
+        return
+    path = iri(path_iri(path_name, base))
+    steps = step_prefix(path_name, base)
+    positions = position_prefix(path_name, base)
+    rank = 1
+    position = 1
+    step_handle = odgi_graph.path_begin(path_handle)
+    while True:
+        node_handle = odgi_graph.get_handle_of_step(step_handle)
+        position = write_step(odgi_graph, base, writer, node_handle, path, steps, positions, rank, position)
+        if not odgi_graph.has_next_step(step_handle):
+            break
+        step_handle = odgi_graph.get_next_step(step_handle)
+        rank = rank + 1
+
+
+def write_paths(odgi_graph: odgi, base: str, writer, path_names):
+    for path_name in path_names:
+        writer.triple(iri(path_iri(path_name, base)), rdf_type, vg_path_type)
+
+
+def path_names_of(odgi_graph: odgi):
+    names = []
+    odgi_graph.for_each_path_handle(CollectPathNames(odgi_graph, names))
+    return names
+
+
+def prefixes_for(base: str):
+    return {'rdf': str(RDF), 'vg': str(VG), 'faldo': str(FALDO), 'node': f'{base}node/'}
+
+
+def new_writer(out, syntax: str, base: str):
+    if syntax in ('turtle', 'ttl'):
+        return TurtleWriter(out, prefixes_for(base))
+    return NTriplesWriter(out)
+
+
+class ChunkedWriter:
+    """\
+    Writes the triples to a series of numbered files of at most triples_per_chunk triples each,
+    or to just the one file when triples_per_chunk is None. Each chunk can be loaded on its own.
+    """
+
+    def __init__(self, file_name: str, syntax: str, base: str, compression: str = None,
+                 triples_per_chunk: int = None, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        self.file_name = file_name
+        self.syntax = syntax
+        self.base = base
+        self.compression = compression
+        self.triples_per_chunk = triples_per_chunk
+        self.buffer_size = buffer_size
+        self.files = []
+        self._output = None
+        self._writer = None
+        self._count = 0
+        if triples_per_chunk is None:
+            self._next_chunk()
+
+    def _next_chunk(self):
+        self.close()
+        if self.triples_per_chunk is None:
+            file_name = self.file_name
+        else:
+            file_name = numbered(self.file_name, len(self.files))
+        self._output = Output(file_name, self.compression, self.buffer_size)
+        self._writer = new_writer(self._output, self.syntax, self.base)
+        self._count = 0
+        self.files.append(file_name)
+
+    def triple(self, s: str, p: str, o: str):
+        if self._writer is None or (self.triples_per_chunk is not None and self._count >= self.triples_per_chunk):
+            self._next_chunk()
+        self._writer.triple(s, p, o)
+        self._count = self._count + 1
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._output.close()
+            self._writer = None
+            self._output = None
+
+
+def write_triples(odgi_graph: odgi, base: str, writer):
+    """Passes all triples of the graph, in the order of a full scan of the store, to the writer"""
+    path_names = path_names_of(odgi_graph)
+    write_nodes(odgi_graph, base, writer, NodeIds(odgi_graph))
+    for path_name in path_names:
+        write_path_steps(odgi_graph, base, writer, path_name)
+    write_paths(odgi_graph, base, writer, path_names)
+
+
+def write_graph(odgi_graph: odgi, base: str, out, syntax: str = 'ntriples'):
+    """Writes all triples of the graph to the text stream out"""
+    writer = new_writer(out, syntax, base)
+    write_triples(odgi_graph, base, writer)
+    writer.close()
+
+
+# the graph opened by each process of the export pool, with the ids of its nodes
+worker_graph = None
+worker_node_ids = None
+
+
+def open_worker_graph(odgi_file: str):
+    global worker_graph, worker_node_ids
+    worker_graph = odgi.graph()
+    worker_graph.load(odgi_file)
+    worker_node_ids = NodeIds(worker_graph)
+
+
+def write_shard(shard):
+    """Writes one shard to its own file, or chunk files, in a process of the export pool"""
+    file_name, syntax, base, compression, triples_per_chunk, buffer_size, kind, argument = shard
+    writer = ChunkedWriter(file_name, syntax, base, compression, triples_per_chunk, buffer_size)
+    if kind == 'nodes':
+        write_nodes(worker_graph, base, writer, worker_node_ids.between(*argument))
+    elif kind == 'steps':
+        write_path_steps(worker_graph, base, writer, argument)
+    else:
+        write_paths(worker_graph, base, writer, argument)
+    writer.close()
+    return writer.files
+
+
+def shards_of(odgi_graph: odgi, output: str, nodes_per_shard: int, settings):
+    """The shards in the order of a full scan: runs of nodes_per_shard nodes, the steps per path, and the paths"""
+    work = []
+    # the same number of nodes in each shard, also where the ids are sparse
+    for batch in NodeIds(odgi_graph).batches(nodes_per_shard):
+        work.append(('nodes', (batch[0], batch[-1])))
+    path_names = path_names_of(odgi_graph)
+    for path_name in path_names:
+        work.append(('steps', path_name))
+    work.append(('paths', path_names))
+    return [(numbered(output, i), *settings, kind, argument) for i, (kind, argument) in enumerate(work)]
+
+
+def export(odgi_file: str, output: str, base: str, syntax: str = 'ntriples', workers: int = 1,
+           nodes_per_shard: int = 1000000, concatenate: bool = True, compression: str = None,
+           triples_per_chunk: int = None, buffer_size: int = DEFAULT_BUFFER_SIZE):
+    """\
+    Exports the odgi file to the output file, '-' for standard out. The compression is taken
+    from the suffix of the output file if it is not given. With triples_per_chunk the output
+    is split over numbered chunk files instead.
+
+    With more than one worker, a pool of processes that each open the odgi file once writes
+    the shards next to the output file. If concatenate is set, and the output is not chunked,
+    they are joined in order into the output file and removed. Returns the files written.
+    """
+    if compression is None:
+        compression = compression_of(output)
+    if workers > 1 and output == '-':
+        # the shards need a place on disk before they go to standard out
+        with tempfile.TemporaryDirectory() as directory:
+            extension = TurtleWriter.extension if syntax in ('turtle', 'ttl') else NTriplesWriter.extension
+            files = export(odgi_file, os.path.join(directory, f'export.{extension}'), base, syntax, workers,
+                           nodes_per_shard, False, compression, None, buffer_size)
+            concatenate_files(files, sys.stdout.buffer)
+            sys.stdout.buffer.flush()
+        return [output]
+
+    odgi_graph = odgi.graph()
+    odgi_graph.load(odgi_file)
+    if workers <= 1:
+        writer = ChunkedWriter(output, syntax, base, compression, triples_per_chunk, buffer_size)
+        write_triples(odgi_graph, base, writer)
+        writer.close()
+        return writer.files
+
+    settings = (syntax, base, compression, triples_per_chunk, buffer_size)
+    shards = shards_of(odgi_graph, output, nodes_per_shard, settings)
+    with Pool(workers, initializer=open_worker_graph, initargs=(odgi_file,)) as pool:
+        files = [file_name for shard_files in pool.map(write_shard, shards, chunksize=1)
+                 for file_name in shard_files]
+    if not concatenate or triples_per_chunk is not None:
+        return files
+    with open(output, 'wb') as out:
+        concatenate_files(files, out)
+    return [output]
+
+
+def concatenate_files(files, out):
+    """Copies the files, in order, to the binary stream out and removes them"""
+    for file_name in files:
+        with open(file_name, 'rb') as part:
+            shutil.copyfileobj(part, out, 16 * 1024 * 1024)
+        os.remove(file_name)
@@ -0,0 +1,270 @@
+"""
+This module defines indexes over the odgi graph that odgi itself does not keep.
+
+* :class:`Step index of a path <PathStepIndex>`
+* :class:`Ids of the nodes <NodeIds>`
+* :class:`Sequence lengths of the nodes <NodeLengths>`
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+import odgi
+
+__all__ = [
+    'NodeIds',
+    'NodeLengths',
+    'PathStepIndex'
+]
+
+
+class PathStepIndex:
+    """\
+    Rank and position lookup for the steps of one path.
+
+    The path is walked once, the step handles, node ids and orientations are kept in rank
+    order and the positions are kept as a prefix sum of the node lengths. Ranks and
+    positions are 1 based, as they are in the IRIs we generate.
+
+    An index can also be made from the arrays of a sidecar file, see :mod:`spodgi.sidecar`.
+    Then the path is only walked for the step handles, the first time one is asked for.
+    """
+    __slots__ = ("_odgi", "_path_handle", "_steps", "_positions", "_node_ids", "_reverse", "_node_order")
+
+    def __init__(self, odgi_graph: odgi, path_handle: odgi.path_handle, positions=None, node_ids=None,
+                 reverse=None, node_order=None):
+        self._odgi = odgi_graph
+        self._path_handle = path_handle
+        if positions is not None:
+            self._steps = None
+            self._positions = positions
+            self._node_ids = node_ids
+            self._reverse = reverse
+            self._node_order = node_order
+            return
+        self._steps = []
+        self._positions = array('Q')
+        self._node_ids = array('Q')
+        self._reverse = array('B')
+        self._node_order = None
+        position = 1
+        step_handle = None if odgi_graph.is_empty(path_handle) else odgi_graph.path_begin(path_handle)
+        while step_handle is not None:
+            node_handle = odgi_graph.get_handle_of_step(step_handle)
+            self._steps.append(step_handle)
+            self._positions.append(position)
+            self._node_ids.append(odgi_graph.get_id(node_handle))
+            self._reverse.append(odgi_graph.get_is_reverse(node_handle))
+            position = position + odgi_graph.get_length(node_handle)
+            step_handle = odgi_graph.get_next_step(step_handle) if odgi_graph.has_next_step(step_handle) else None
+        # one extra entry so that the end of the last step is known as well
+        self._positions.append(position)
+
+    def _walk_steps(self):
+        steps = []
+        if len(self._node_ids) > 0:
+            step_handle = self._odgi.path_begin(self._path_handle)
+            steps.append(step_handle)
+            while self._odgi.has_next_step(step_handle):
+                step_handle = self._odgi.get_next_step(step_handle)
+                steps.append(step_handle)
+        self._steps = steps
+
+    def __len__(self):
+        return len(self._node_ids)
+
+    def has_rank(self, rank: int):
+        return 0 < rank <= len(self._node_ids)
+
+    def step(self, rank: int):
+        if self._steps is None:
+            self._walk_steps()
+        return self._steps[rank - 1]
+
+    def node_id(self, rank: int):
+        return self._node_ids[rank - 1]
+
+    def is_reverse(self, rank: int):
+        return bool(self._reverse[rank - 1])
+
+    def node_handle(self, rank: int):
+        """The handle of the node of the step, in the orientation of the step, without the step handle"""
+        return self._odgi.get_handle(self._node_ids[rank - 1], bool(self._reverse[rank - 1]))
+
+    def position(self, rank: int):
+        return self._positions[rank - 1]
+
+    def end_position(self, rank: int):
+        return self._positions[rank]
+
+    def rank_starting_at(self, position: int):
+        """The rank of the step that begins at the position, found by binary search"""
+        i = bisect_left(self._positions, position, 0, len(self._node_ids))
+        if i < len(self._node_ids) and self._positions[i] == position:
+            return i + 1
+        return None
+
+    def rank_ending_at(self, position: int):
+        """The rank of the step that ends at the position, found by binary search"""
+        i = bisect_left(self._positions, position, 1)
+        if i < len(self._positions) and self._positions[i] == position:
+            return i
+        return None
+
+    def ranks_between(self, begin_min: int = None, begin_max: int = None, end_min: int = None, end_max: int = None):
+        """\
+        The ranks of the steps of which the begin and end positions are within the given (inclusive) bounds.
+
+        Both the begin and the end positions only increase with the rank, so each bound cuts the ranks at
+        a point that is found by binary search.
+        """
+        size = len(self._node_ids)
+        first = 1
+        last = size
+        if begin_min is not None:
+            first = max(first, bisect_left(self._positions, begin_min, 0, size) + 1)
+        if begin_max is not None:
+            last = min(last, bisect_right(self._positions, begin_max, 0, size))
+        if end_min is not None:
+            first = max(first, bisect_left(self._positions, end_min, 1, size + 1))
+        if end_max is not None:
+            last = min(last, bisect_right(self._positions, end_max, 1, size + 1) - 1)
+        return range(first, max(first, last + 1))
+
+    def ranks_of_node(self, node_id: int):
+        """\
+        The ranks of the steps that visit the node, in rank order.
+
+        The first call sorts the ranks by node id, after which a node is found by binary search.
+        """
+        node_order = self.node_order()
+        first = bisect_left(node_order, node_id, key=self._node_ids.__getitem__)
+        last = bisect_right(node_order, node_id, key=self._node_ids.__getitem__)
+        return [i + 1 for i in node_order[first:last]]
+
+    def node_order(self):
+        """The places of the steps sorted by their node id, sorted on first use"""
+        if self._node_order is None:
+            self._node_order = array('Q', sorted(range(len(self._node_ids)), key=self._node_ids.__getitem__))
+        return self._node_order
+
+    def arrays(self):
+        """The positions, node ids, orientations and node order, as a sidecar file keeps them"""
+        return self._positions, self._node_ids, self._reverse, self.node_order()
+
+    def ranks(self):
+        return range(1, len(self._node_ids) + 1)
+
+
+class CollectNodeIds:
+    def __init__(self, odgi_graph: odgi, ids: array):
+        self.odgi_graph = odgi_graph
+        self.ids = ids
+
+    def __call__(self, handle):
+        self.ids.append(self.odgi_graph.get_id(handle))
+
+
+class NodeIds:
+    """\
+    The ids of the nodes of the graph, in ascending order, without asking has_node for every id
+    between the smallest and the largest.
+
+    When there are as many nodes as ids in that span, which is how odgi numbers the nodes of a
+    graph that has been built or sorted, they are the range of ids itself. Otherwise, after
+    pruning or chopping, they are collected once with for_each_handle.
+    """
+    __slots__ = ("_ids",)
+
+    def __init__(self, odgi_graph: odgi, ids=None):
+        if ids is not None:
+            # as kept in a sidecar file
+            self._ids = ids
+            return
+        count = odgi_graph.get_node_count()
+        if count == 0:
+            self._ids = range(0)
+            return
+        first = odgi_graph.min_node_id()
+        last = odgi_graph.max_node_id()
+        if last - first + 1 == count:
+            self._ids = range(first, last + 1)
+            return
+        ids = array('Q')
+        odgi_graph.for_each_handle(CollectNodeIds(odgi_graph, ids))
+        if any(ids[i] > ids[i + 1] for i in range(len(ids) - 1)):
+            ids = array('Q', sorted(ids))
+        self._ids = ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def is_range(self):
+        """Whether the ids are all ids from the smallest up to the largest"""
+        return isinstance(self._ids, range)
+
+    def ids(self):
+        return self._ids
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __getitem__(self, i: int):
+        return self._ids[i]
+
+    def index(self, node_id: int):
+        """The place of the id in the ascending order, found by binary search"""
+        i = bisect_left(self._ids, node_id)
+        if i == len(self._ids) or self._ids[i] != node_id:
+            raise ValueError(f'no node {node_id} in the graph')
+        return i
+
+    def between(self, first: int, last: int):
+        """The ids from first up to and including last, found by binary search"""
+        return self._ids[bisect_left(self._ids, first):bisect_right(self._ids, last)]
+
+    def batches(self, size: int):
+        """The ids in consecutive runs of at most size ids"""
+        for start in range(0, len(self._ids), size):
+            yield self._ids[start:start + size]
+
+
+class NodeLengths:
+    """\
+    The sequence lengths of the nodes, in the order of their ids, as an array of 4 byte integers.
+
+    The first call of node_ids_between sorts the nodes by length, after which the nodes with a
+    length between two bounds are found by binary search, without looking at the others.
+    """
+    __slots__ = ("_node_ids", "_lengths", "_length_order")
+
+    def __init__(self, odgi_graph: odgi, node_ids: NodeIds, lengths=None):
+        self._node_ids = node_ids
+        self._length_order = None
+        if lengths is not None:
+            # as kept in a sidecar file
+            self._lengths = lengths
+            return
+        get_handle = odgi_graph.get_handle
+        get_length = odgi_graph.get_length
+        self._lengths = array('I', (get_length(get_handle(node_id)) for node_id in node_ids))
+
+    def lengths(self):
+        return self._lengths
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def length(self, node_id: int):
+        return self._lengths[self._node_ids.index(node_id)]
+
+    def node_ids_between(self, min_length: int = None, max_length: int = None):
+        """The ids, in ascending order, of the nodes with a length within the (inclusive) bounds"""
+        if self._length_order is None:
+            self._length_order = array('Q', sorted(range(len(self._lengths)), key=self._lengths.__getitem__))
+        first = 0
+        last = len(self._length_order)
+        if min_length is not None:
+            first = bisect_left(self._length_order, min_length, key=self._lengths.__getitem__)
+        if max_length is not None:
+            last = bisect_right(self._length_order, max_length, key=self._lengths.__getitem__)
+        return [self._node_ids[i] for i in sorted(self._length_order[first:last])]
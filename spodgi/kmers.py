@@ -0,0 +1,266 @@
+"""
+An optional k-mer index of the node sequences, kept on disk beside the odgi file, and the
+search for sequence motifs with it.
+
+A filter such as FILTER(regex(?seq, '[AT]AAT')) or FILTER(CONTAINS(?seq, "GATTACA")) would
+otherwise read every node sequence. The index maps each k-mer to the nodes that contain it, so
+only the nodes that contain all k-mers of the motif are candidates, and only those are read and
+matched. A motif shorter than k, or one that is not simple, is not filtered with the index.
+
+A simple motif is a series of bases and classes of bases, such as GATTACA or [AT]AAT, which
+has one length. The same motifs can be searched for along the paths, where matches may span
+the sequences of more than one step.
+
+The index file, graph.odgi.kmers for graph.odgi, has a little endian header, while the arrays are in
+the byte order of the host that wrote them, so that they can be used as mapped:
+
+* a header, see :data:`header`, with the size, modification time and checksum of the odgi file it was
+  built from, see :func:`spodgi.sidecar.odgi_signature`, and the byte order of the arrays, an index of
+  the other byte order is ignored
+* the distinct k-mers, 2 bits per base, in ascending order (8 bytes each)
+* for each k-mer the offset of its first node id in the node ids, and one more for the end (8 bytes each)
+* the node ids, ascending per k-mer (8 bytes each)
+
+* :func:`Build the index <build_kmer_index>`
+* :class:`The index <KmerIndex>`
+* :func:`The alternatives of a simple motif <motif_alternatives>`
+* :func:`Matches on the paths <path_matches>`
+"""
+
+import mmap
+import os
+import re
+import struct
+import sys
+import warnings
+from array import array
+from bisect import bisect_left
+import odgi
+from spodgi.index import NodeIds
+from spodgi.sidecar import odgi_signature
+
+__all__ = [
+    'KmerIndex',
+    'build_kmer_index',
+    'kmer_index_file',
+    'motif_alternatives',
+    'path_matches'
+]
+
+MAGIC = b'SPKMERS\0'
+VERSION = 2
+# magic, version, k, number of distinct k-mers, number of node ids, odgi file size, modification time and
+# checksum, byte order of the arrays, padded so that the arrays start at a multiple of 8 bytes
+header = struct.Struct('<8sIIQQQqI4x8s')
+
+DEFAULT_K = 4
+# a class of bases makes a motif into as many alternatives as it has bases, no more than these are looked up
+MAX_ALTERNATIVES = 64
+
+base_codes = {'A': 0, 'C': 1, 'G': 2, 'T': 3}
+
+
+def kmer_index_file(odgi_file: str):
+    return f'{odgi_file}.kmers'
+
+
+def kmer_codes(sequence: str, k: int):
+    """The codes of the k-mers in the sequence, skipping those with a base other than A, C, G or T"""
+    mask = (1 << (2 * k)) - 1
+    code = 0
+    valid = 0
+    for base in sequence:
+        base_code = base_codes.get(base)
+        if base_code is None:
+            valid = 0
+            continue
+        code = ((code << 2) | base_code) & mask
+        valid = valid + 1
+        if valid >= k:
+            yield code
+
+
+def build_kmer_index(odgi_graph: odgi, odgi_file: str, k: int = DEFAULT_K, file_name: str = None):
+    """\
+    Writes the k-mer index of the node sequences of the graph, loaded from odgi_file, beside it
+    or to file_name. Returns the name of the file written.
+    """
+    if not 0 < k <= 31:
+        raise ValueError('k must be between 1 and 31')
+    if file_name is None:
+        file_name = kmer_index_file(odgi_file)
+    postings = {}
+    get_handle = odgi_graph.get_handle
+    get_sequence = odgi_graph.get_sequence
+    # the nodes come in id order, so the node ids of each k-mer are in ascending order as well
+    for node_id in NodeIds(odgi_graph):
+        for code in kmer_codes(get_sequence(get_handle(node_id)), k):
+            node_ids = postings.get(code)
+            if node_ids is None:
+                postings[code] = array('Q', [node_id])
+            elif node_ids[-1] != node_id:
+                node_ids.append(node_id)
+    codes = array('Q', sorted(postings))
+    offsets = array('Q', [0])
+    for code in codes:
+        offsets.append(offsets[-1] + len(postings[code]))
+    size, mtime, checksum = odgi_signature(odgi_file)
+    with open(file_name + '.tmp', 'wb') as out:
+        out.write(header.pack(MAGIC, VERSION, k, len(codes), offsets[-1], size, mtime, checksum,
+                              sys.byteorder.encode('ascii')))
+        for part in (codes, offsets):
+            out.write(part.tobytes())
+        for code in codes:
+            out.write(postings[code].tobytes())
+    # readers never see a half written index
+    os.replace(file_name + '.tmp', file_name)
+    return file_name
+
+
+class KmerIndex:
+    """\
+    The k-mer index of an odgi file, memory mapped. The arrays are read from the mapped pages
+    as they are used, so loading it costs next to nothing.
+    """
+
+    def __init__(self, file_name: str):
+        with open(file_name, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, self.k, kmer_count, node_id_count, self.odgi_size, self.odgi_mtime, \
+                self.odgi_checksum, byte_order = header.unpack_from(self._map)
+        except struct.error:
+            self._map.close()
+            raise ValueError(f'{file_name} is cut short')
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f'{file_name} is not a k-mer index of version {VERSION}')
+        byte_order = byte_order.rstrip(b'\0').decode('ascii', 'replace')
+        if byte_order != sys.byteorder:
+            self._map.close()
+            raise ValueError(f'{file_name} is {byte_order} endian, this host is {sys.byteorder} endian')
+        if len(self._map) != header.size + 8 * (2 * kmer_count + 1 + node_id_count):
+            self._map.close()
+            raise ValueError(f'{file_name} does not have the size its header gives')
+        words = memoryview(self._map)[header.size:].cast('Q')
+        self._codes = words[:kmer_count]
+        self._offsets = words[kmer_count:2 * kmer_count + 1]
+        self._node_ids = words[2 * kmer_count + 1:2 * kmer_count + 1 + node_id_count]
+        self._views = [words, self._codes, self._offsets, self._node_ids]
+
+    @classmethod
+    def load(cls, odgi_file: str):
+        """\
+        The index beside the odgi file, None if there is none, if it was built from an other version
+        of the file, or if it can not be read
+        """
+        file_name = kmer_index_file(odgi_file)
+        if not os.path.exists(file_name):
+            return None
+        try:
+            index = cls(file_name)
+        except (OSError, ValueError) as e:
+            warnings.warn(f'ignoring the k-mer index {file_name}: {e}')
+            return None
+        if (index.odgi_size, index.odgi_mtime, index.odgi_checksum) != odgi_signature(odgi_file):
+            index.close()
+            return None
+        return index
+
+    def close(self):
+        # the map can only be closed once nothing points into it anymore
+        for view in self._views:
+            view.release()
+        try:
+            self._map.close()
+        except BufferError:
+            # a slice is still held elsewhere, the map is closed when that is gone
+            pass
+
+    def node_ids_of(self, code: int):
+        i = bisect_left(self._codes, code)
+        if i == len(self._codes) or self._codes[i] != code:
+            return self._node_ids[0:0]
+        return self._node_ids[self._offsets[i]:self._offsets[i + 1]]
+
+    def node_ids_containing(self, literal: str):
+        """\
+        The ids, in ascending order, of the nodes that contain all k-mers of the literal, which include
+        all nodes that contain the literal. None if the index can not tell, as for a literal shorter than k.
+        """
+        # a node that contains the literal contains each of its k-mers without an other base than A, C, G or T
+        codes = set(kmer_codes(literal, self.k))
+        if not codes:
+            return None
+        candidates = None
+        # the rarest k-mer first, so that the set to intersect stays small
+        for node_ids in sorted((self.node_ids_of(code) for code in codes), key=len):
+            if candidates is None:
+                candidates = set(node_ids)
+            else:
+                candidates.intersection_update(node_ids)
+            if not candidates:
+                break
+        return sorted(candidates)
+
+    def candidates(self, alternatives):
+        """The ids of the nodes that may contain any of the literals, None if the index can not tell"""
+        found = set()
+        for literal in alternatives:
+            node_ids = self.node_ids_containing(literal)
+            if node_ids is None:
+                return None
+            found.update(node_ids)
+        return sorted(found)
+
+
+simple_motif = re.compile(r'(?:[ACGTacgt]|\[[ACGTacgt]+\])+')
+motif_part = re.compile(r'[ACGTacgt]|\[([ACGTacgt]+)\]')
+
+
+def motif_alternatives(pattern: str):
+    """\
+    The literals one of which a match of a simple motif is, such as AAAT and TAAT for [AT]AAT.
+    None if the pattern is not a simple motif or has more than MAX_ALTERNATIVES of them.
+    """
+    if not simple_motif.fullmatch(pattern):
+        return None
+    alternatives = ['']
+    for part in motif_part.finditer(pattern):
+        bases = sorted(set(part.group(1))) if part.group(1) else [part.group()]
+        if len(alternatives) * len(bases) > MAX_ALTERNATIVES:
+            return None
+        alternatives = [alternative + base for alternative in alternatives for base in bases]
+    return alternatives
+
+
+def path_matches(store, pattern: str, path=None):
+    """\
+    The matches of a simple motif along the paths, or one path, as (path IRI, begin, end, matched sequence),
+    with 1 based begin and exclusive end positions as in the step IRIs. Matches may span more than one step.
+    The steps of a path are read in order, and the last bases of the steps before are kept to find the
+    matches that start in them. Overlapping matches are all found.
+    """
+    alternatives = motif_alternatives(pattern)
+    if alternatives is None:
+        raise ValueError(f'{pattern} is not a simple motif of bases and classes of bases')
+    length = len(alternatives[0])
+    # a lookahead finds the matches that overlap as well
+    motif = re.compile(f'(?=({pattern}))')
+    odgi_graph = store.odgi_graph
+    for path_ref in store.matching_paths(path):
+        step_index = store.step_index(path_ref.path())
+        carried = ''
+        carried_from = 1
+        for rank in step_index.ranks():
+            node_handle = step_index.node_handle(rank)
+            # the sequence of a step on the reverse strand is the reverse complement of the node
+            text = carried + odgi_graph.get_sequence(node_handle)
+            for match in motif.finditer(text):
+                if match.start() + length <= len(text):
+                    begin = carried_from + match.start()
+                    yield path_ref, begin, begin + length, match.group(1)
+            # a match that starts in the last length - 1 bases can only end in the next steps
+            keep = min(length - 1, len(text))
+            carried_from = carried_from + len(text) - keep
+            carried = text[len(text) - keep:]
@@ -0,0 +1,153 @@
+"""
+A pre-forking HTTP server for the SPARQL endpoint.
+
+The parent process binds the listening socket and forks the workers, which all accept
+connections from that one socket. Each worker opens its own graph once, after the fork,
+and keeps it for all the requests it serves. Connections that no worker has accepted yet
+wait in the listen backlog of the socket, and a worker that is busy with more requests
+than it allows answers the next ones with 503 Service Unavailable.
+
+* :func:`Serve a WSGI application from a number of worker processes <serve>`
+* :class:`Admission control of a worker <Admission>`
+"""
+
+import os
+import signal
+import socket
+import sys
+from threading import BoundedSemaphore, Lock
+from werkzeug.serving import make_server
+from werkzeug.wsgi import ClosingIterator
+
+__all__ = [
+    'Admission',
+    'serve'
+]
+
+
+class Admission:
+    """\
+    WSGI middleware that lets at most max_active requests into the application at the same time.
+    Up to max_waiting more wait, for at most timeout seconds, for one of those to finish. Any other
+    request is refused with 503 and a Retry-After header, so that a client or proxy backs off
+    instead of piling more work onto a busy worker.
+    """
+
+    def __init__(self, app, max_active: int = 1, max_waiting: int = 16, timeout: float = 30.0, retry_after: int = 1):
+        self.app = app
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._active = BoundedSemaphore(max_active)
+        self._lock = Lock()
+        self.waiting = 0
+        self.refused = 0
+
+    def __call__(self, environ, start_response):
+        # only a request that finds no free slot waits, and counts against max_waiting
+        if not self._active.acquire(blocking=False):
+            with self._lock:
+                if self.waiting >= self.max_waiting:
+                    self.refused = self.refused + 1
+                    return self.refuse(start_response)
+                self.waiting = self.waiting + 1
+            admitted = self._active.acquire(timeout=self.timeout)
+            with self._lock:
+                self.waiting = self.waiting - 1
+                if not admitted:
+                    self.refused = self.refused + 1
+            if not admitted:
+                return self.refuse(start_response)
+        try:
+            result = self.app(environ, start_response)
+        except BaseException:
+            self._active.release()
+            raise
+        # the next request gets in once this result has been sent, also when it is streamed
+        return ClosingIterator(result, self._active.release)
+
+    def refuse(self, start_response):
+        start_response('503 Service Unavailable', [('Content-Type', 'text/plain'),
+                                                   ('Retry-After', str(self.retry_after))])
+        return [b'The SPARQL endpoint is busy, please retry later\n']
+
+
+def listen(host: str, port: int, backlog: int):
+    sock = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+# the exit code of a worker that could not open its graph, which a new worker would not do better
+INITIALIZER_FAILED = 3
+
+
+def run_worker(app, sock, host: str, port: int, threaded: bool, initializer):
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    if initializer is not None:
+        try:
+            initializer()
+        except BaseException as e:
+            print(f'Worker {os.getpid()} could not start: {e}', file=sys.stderr)
+            os._exit(INITIALIZER_FAILED)
+    server = make_server(host, port, app, threaded=threaded, fd=sock.fileno())
+    server.serve_forever()
+
+
+def serve(app, host: str = '0.0.0.0', port: int = 5001, workers: int = 2, threaded: bool = True, backlog: int = 128,
+          initializer=None):
+    """\
+    Serves the WSGI application from workers forked processes until the parent gets SIGINT or SIGTERM.
+    The initializer is called once in every worker, before it accepts any connection, and is where the
+    worker opens its graph. A threaded worker handles each connection in its own thread, so wrap the
+    application in an :class:`Admission` to bound how many of those run a query at the same time.
+    A worker that dies is replaced by a new one.
+    """
+    sock = listen(host, port, backlog)
+    children = set()
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(app, sock, host, port, threaded, initializer)
+            except BaseException as e:
+                print(f'Worker {os.getpid()} stopped: {e}', file=sys.stderr)
+                code = 1
+            finally:
+                os._exit(code)
+        children.add(pid)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        spawn()
+    print(f'Serving on http://{host}:{port} with {workers} workers', file=sys.stderr)
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        children.discard(pid)
+        if os.waitstatus_to_exitcode(status) == INITIALIZER_FAILED and not stopping:
+            stop(None, None)
+        elif not stopping:
+            spawn()
+    sock.close()
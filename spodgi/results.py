@@ -0,0 +1,327 @@
+"""
+Streaming serialization of SPARQL results.
+
+rdflib's Result.serialize() writes the whole document before the first byte can be sent.
+Here the solutions are taken from the query evaluation one at a time and written as they
+come, in blocks of about block_size bytes, so that neither the time to the first byte nor
+the memory used grows with the number of results.
+
+* SELECT as SPARQL JSON, SPARQL XML, CSV or TSV
+* ASK as SPARQL JSON or SPARQL XML
+* CONSTRUCT as N-Triples, a triple is written once per solution that produces it
+"""
+
+import csv
+import io
+import json
+import re
+from xml.sax.saxutils import escape, quoteattr
+from rdflib.plugins.sparql import prepareQuery
+from rdflib.plugins.sparql.evaluate import evalPart
+from rdflib.plugins.sparql.evalutils import _fillTemplate
+from rdflib.plugins.sparql.sparql import Query, QueryContext
+from rdflib.term import BNode, Literal, Variable
+from rdflib.util import from_n3
+from spodgi.cache import LruCache
+
+__all__ = [
+    'PreparedQueries',
+    'StreamedResult',
+    'bindings_from',
+    'blocks',
+    'cached_blocks',
+    'mimetypes',
+    'normalize_query',
+    'prepare',
+    'query_type',
+    'stream_query'
+]
+
+mimetypes = {
+    'json': 'application/sparql-results+json',
+    'xml': 'application/sparql-results+xml',
+    'csv': 'text/csv',
+    'tsv': 'text/tab-separated-values',
+    'nt': 'application/n-triples',
+    'ntriples': 'application/n-triples'
+}
+
+select_formats = {'json', 'xml', 'csv', 'tsv'}
+ask_formats = {'json', 'xml'}
+construct_formats = {'nt', 'ntriples'}
+
+
+class StreamedResult:
+    """\
+    A query that has been parsed and translated, but not yet evaluated. Iterating it evaluates
+    the query and gives the serialized result as a series of byte blocks.
+    """
+
+    def __init__(self, graph, query: Query, output_format: str, init_bindings=None, block_size: int = 64 * 1024):
+        self.graph = graph
+        self.query = query
+        self.output_format = output_format
+        self.init_bindings = init_bindings
+        self.block_size = block_size
+        self.mimetype = mimetypes[output_format]
+
+    def __iter__(self):
+        main = self.query.algebra
+        init_bindings = dict((Variable(k), v) for k, v in (self.init_bindings or {}).items())
+        ctx = QueryContext(self.graph, initBindings=init_bindings, datasetClause=main.datasetClause)
+        ctx.prologue = self.query.prologue
+        if main.name == 'SelectQuery':
+            rows = select_serializers[self.output_format](main.PV, evalPart(ctx, main.p))
+        elif main.name == 'AskQuery':
+            rows = ask_serializers[self.output_format](evalPart(ctx, main)['askAnswer'])
+        else:
+            template = main.template
+            if not template:
+                # a construct-where query, of which the pattern is the template
+                part = main.p
+                while part.name != 'BGP':
+                    part = part.p
+                template = part.triples
+            rows = ntriples(template, evalPart(ctx, main.p))
+        return blocks(rows, self.block_size)
+
+
+def query_type(query: Query):
+    return query.algebra.name[:-len('Query')].upper()
+
+
+def can_stream(query: Query, output_format: str):
+    kind = query_type(query)
+    if kind == 'SELECT':
+        return output_format in select_formats
+    elif kind == 'ASK':
+        return output_format in ask_formats
+    elif kind == 'CONSTRUCT':
+        return output_format in construct_formats
+    return False
+
+
+def prepare(graph, query: str, init_ns=None):
+    """Parses and translates the query, with the prefixes bound in the graph as Graph.query() does"""
+    if init_ns is None:
+        init_ns = dict(graph.namespaces())
+    return prepareQuery(query, initNs=init_ns)
+
+
+class PreparedQueries:
+    """\
+    The parsed and translated queries, by their normalized text, so that a query that is asked
+    again skips the parsing and the translation to the algebra. A query that differs only in its
+    constants can be written once, with a variable for each constant, and given the values
+    as initial bindings, so that all of them share the one prepared query.
+    """
+
+    def __init__(self, max_entries: int = 128):
+        self._queries = LruCache(max_entries)
+
+    def prepare(self, graph, query: str):
+        key = normalize_query(query)
+        prepared = self._queries.get(key)
+        if prepared is None:
+            prepared = prepare(graph, query)
+            self._queries.put(key, prepared)
+        return prepared
+
+    def stats(self):
+        return self._queries.stats()
+
+
+def bindings_from(graph, values):
+    """\
+    The initial bindings given as (name, term) pairs, where the term is in N-Triples syntax,
+    or a prefixed name with a prefix bound in the graph. For example ('node', '<http://example.org/vg/node/1>').
+    Raises ValueError for a term that is not one of those, which from_n3 would take for something else.
+    """
+    bindings = {}
+    for name, term in values:
+        term = term.strip()
+        try:
+            value = from_n3(term, nsm=graph.namespace_manager)
+        except (KeyError, ValueError, IndexError):
+            value = None
+        if term.startswith('<'):
+            valid = n3_iri.fullmatch(term) is not None
+        elif term.startswith('"'):
+            valid = n3_literal.fullmatch(term) is not None
+        else:
+            valid = not isinstance(value, BNode)
+        if value is None or not valid:
+            raise ValueError(f'{term} is not an IRI, a literal or a prefixed name with a known prefix')
+        bindings[Variable(name)] = value
+    return bindings
+
+
+def stream_query(graph, query, output_format: str, init_bindings=None, init_ns=None):
+    """\
+    A StreamedResult for the query, a string or a prepared Query, in the output format.
+    None when the result can not be streamed in that format, such as a DESCRIBE query or
+    a CONSTRUCT asked for as RDF/XML. The query is parsed here, so syntax errors are raised
+    before any of the response is sent.
+    """
+    if isinstance(query, str):
+        query = prepare(graph, query, init_ns)
+    if not can_stream(query, output_format):
+        return None
+    return StreamedResult(graph, query, output_format, init_bindings)
+
+
+def blocks(rows, block_size: int):
+    """Joins the serialized rows into blocks of about block_size bytes"""
+    pending = []
+    size = 0
+    for row in rows:
+        pending.append(row)
+        size = size + len(row)
+        if size >= block_size:
+            yield ''.join(pending).encode('utf-8')
+            pending.clear()
+            size = 0
+    if pending:
+        yield ''.join(pending).encode('utf-8')
+
+
+def json_term(term):
+    if isinstance(term, Literal):
+        value = {'type': 'literal', 'value': str(term)}
+        if term.language is not None:
+            value['xml:lang'] = term.language
+        elif term.datatype is not None:
+            value['datatype'] = str(term.datatype)
+        return value
+    elif isinstance(term, BNode):
+        return {'type': 'bnode', 'value': str(term)}
+    return {'type': 'uri', 'value': str(term)}
+
+
+def json_select(variables, solutions):
+    yield '{"head":{"vars":' + json.dumps([str(v) for v in variables]) + '},"results":{"bindings":['
+    separator = '\n'
+    for solution in solutions:
+        row = {}
+        for variable in variables:
+            value = solution.get(variable)
+            if value is not None:
+                row[str(variable)] = json_term(value)
+        yield separator + json.dumps(row)
+        separator = ',\n'
+    yield '\n]}}\n'
+
+
+def json_ask(answer: bool):
+    yield '{"head":{},"boolean":' + ('true' if answer else 'false') + '}\n'
+
+
+xml_head = '<?xml version="1.0" encoding="utf-8"?>\n<sparql xmlns="http://www.w3.org/2005/sparql-results#">\n'
+
+
+def xml_term(term):
+    if isinstance(term, Literal):
+        if term.language is not None:
+            return f'<literal xml:lang={quoteattr(term.language)}>{escape(str(term))}</literal>'
+        elif term.datatype is not None:
+            return f'<literal datatype={quoteattr(str(term.datatype))}>{escape(str(term))}</literal>'
+        return f'<literal>{escape(str(term))}</literal>'
+    elif isinstance(term, BNode):
+        return f'<bnode>{escape(str(term))}</bnode>'
+    return f'<uri>{escape(str(term))}</uri>'
+
+
+def xml_select(variables, solutions):
+    names = [str(v) for v in variables]
+    yield xml_head + '<head>' + ''.join(f'<variable name={quoteattr(n)}/>' for n in names) + '</head>\n<results>\n'
+    for solution in solutions:
+        row = ['<result>']
+        for variable, name in zip(variables, names):
+            value = solution.get(variable)
+            if value is not None:
+                row.append(f'<binding name={quoteattr(name)}>{xml_term(value)}</binding>')
+        row.append('</result>\n')
+        yield ''.join(row)
+    yield '</results>\n</sparql>\n'
+
+
+def xml_ask(answer: bool):
+    yield xml_head + '<head/>\n<boolean>' + ('true' if answer else 'false') + '</boolean>\n</sparql>\n'
+
+
+def csv_select(variables, solutions):
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator='\r\n')
+    writer.writerow([str(v) for v in variables])
+    yield out.getvalue()
+    for solution in solutions:
+        out.seek(0)
+        out.truncate()
+        row = []
+        for variable in variables:
+            value = solution.get(variable)
+            row.append('' if value is None else (f'_:{value}' if isinstance(value, BNode) else str(value)))
+        writer.writerow(row)
+        yield out.getvalue()
+
+
+def tsv_select(variables, solutions):
+    yield '\t'.join(f'?{v}' for v in variables) + '\n'
+    for solution in solutions:
+        row = []
+        for variable in variables:
+            value = solution.get(variable)
+            row.append('' if value is None else value.n3())
+        yield '\t'.join(row) + '\n'
+
+
+def ntriples(template, solutions):
+    for solution in solutions:
+        for s, p, o in _fillTemplate(template, solution):
+            yield f'{s.n3()} {p.n3()} {o.n3()} .\n'
+
+
+select_serializers = {'json': json_select, 'xml': xml_select, 'csv': csv_select, 'tsv': tsv_select}
+ask_serializers = {'json': json_ask, 'xml': xml_ask}
+
+
+def cached_blocks(blocks, cache, key, max_size: int):
+    """\
+    Passes on the blocks of a result and, once all of them have been sent, puts them together
+    in the cache. A result that is larger than max_size, or that is not sent to its end because
+    the client went away, is not kept.
+    """
+    kept = []
+    size = 0
+    for block in blocks:
+        if kept is not None:
+            size = size + len(block)
+            if size > max_size:
+                kept = None
+            else:
+                kept.append(block)
+        yield block
+    if kept is not None:
+        cache.put(key, b''.join(kept), size)
+
+
+iri_or_string = re.compile(r'<[^<>"{}|^`\\\s]*>|"""(?:[^"\\]|\\.|"(?!""))*"""|\'\'\'(?:[^\'\\]|\\.|\'(?!\'\'))*\'\'\'|"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'')
+n3_iri = re.compile(r'<[^<>"{}|^`\\\s]*>')
+n3_literal = re.compile(r'"(?:[^"\\\n]|\\.)*"(?:@[A-Za-z]+(?:-[A-Za-z0-9]+)*|\^\^<[^<>"{}|^`\\\s]*>|\^\^\w*:\w*)?')
+comment = re.compile(r'#[^\n]*')
+whitespace = re.compile(r'\s+')
+
+
+def normalize_query(query: str):
+    """\
+    The query without comments and with each run of white space replaced by one space, except within
+    IRIs and strings. Queries that only differ in layout then have the same text, to use as a cache key.
+    """
+    parts = []
+    last = 0
+    for match in iri_or_string.finditer(query):
+        parts.append(whitespace.sub(' ', comment.sub(' ', query[last:match.start()])))
+        parts.append(match.group())
+        last = match.end()
+    parts.append(whitespace.sub(' ', comment.sub(' ', query[last:])))
+    return ''.join(parts).strip()
@@ -0,0 +1,250 @@
+"""
+An optional sidecar file of the indexes that the store would otherwise build from the odgi graph
+on every start: the node ids and lengths, the path names and, per path, the positions, node ids
+and orientations of the steps, and the steps sorted by node. The store memory maps it when it is
+opened, so the arrays are read from the mapped pages as they are used, and processes that open
+the same graph share those pages.
+
+The sidecar file, graph.odgi.spidx for graph.odgi, has a little endian header and table, while the
+sections are in the byte order of the host that wrote them, so that they can be used as mapped:
+
+* a header, see :data:`header`, with the size, modification time and a checksum of the odgi
+  file it was built from, the number of edges, the number of sections and the byte order of the
+  sections, 'little' or 'big', a sidecar of the other byte order is ignored
+* a table of the sections, see :data:`section`, with the name, array type code, offset and
+  number of items of each
+* the sections, each starting at a multiple of 8 bytes
+
+The sections are:
+
+* node_ids, the ids of the nodes in ascending order, or node_id_range, the first and one past the
+  last id when the nodes have all ids in between
+* node_lengths, the sequence lengths of the nodes in the order of their ids
+* path_names, the UTF-8 names of the paths one after the other, and path_name_ends, where each ends
+* path_steps, for each path the place of its first step in the step arrays, and one more for the end
+* step_positions, for each path the begin positions of its steps and the end position of the last
+* step_node_ids and step_reverse, the node and orientation of each step
+* step_node_order, for each path the places of its steps sorted by node id
+
+The step handles themselves are not kept, odgi does not let them be stored, so a path is walked
+for them the first time one is needed.
+
+* :func:`Build the sidecar <build_sidecar>`
+* :class:`The sidecar <Sidecar>`
+"""
+
+import mmap
+import os
+import struct
+import sys
+import warnings
+import zlib
+from array import array
+import odgi
+from spodgi.index import NodeIds, NodeLengths, PathStepIndex
+from spodgi.statistics import CollectPathHandles, GraphStatistics
+
+__all__ = [
+    'Sidecar',
+    'build_sidecar',
+    'sidecar_file'
+]
+
+MAGIC = b'SPIDX\0\0\0'
+VERSION = 3
+# magic, version, number of sections, odgi file size, modification time and checksum, number of edges,
+# byte order of the sections
+header = struct.Struct('<8sIIQqIQ8s')
+# name, array type code, offset in the file and number of items
+section = struct.Struct('<16s4sQQ')
+
+# the checksum covers this many bytes at the start and at the end of the odgi file
+CHECKSUM_BYTES = 1 << 20
+
+
+def sidecar_file(odgi_file: str):
+    return f'{odgi_file}.spidx'
+
+
+def odgi_signature(odgi_file: str):
+    """\
+    The size, modification time and checksum of the odgi file, which a sidecar must have been built from.
+    The checksum is a CRC-32 of the first and last MiB only, so that it is quick for a large graph as well.
+    """
+    stat = os.stat(odgi_file)
+    with open(odgi_file, 'rb') as f:
+        checksum = zlib.crc32(f.read(CHECKSUM_BYTES))
+        if stat.st_size > CHECKSUM_BYTES:
+            f.seek(max(CHECKSUM_BYTES, stat.st_size - CHECKSUM_BYTES))
+            checksum = zlib.crc32(f.read(), checksum)
+    return stat.st_size, stat.st_mtime_ns, checksum
+
+
+def build_sidecar(odgi_graph: odgi, odgi_file: str, file_name: str = None):
+    """\
+    Writes the sidecar of the graph, loaded from odgi_file, beside it or to file_name.
+    Returns the name of the file written.
+    """
+    if file_name is None:
+        file_name = sidecar_file(odgi_file)
+    node_ids = NodeIds(odgi_graph)
+    sections = []
+    if node_ids.is_range():
+        sections.append(('node_id_range', array('Q', [node_ids.ids().start, node_ids.ids().stop])))
+    else:
+        sections.append(('node_ids', array('Q', node_ids.ids())))
+    sections.append(('node_lengths', NodeLengths(odgi_graph, node_ids).lengths()))
+    collect = CollectPathHandles()
+    odgi_graph.for_each_path_handle(collect)
+    names = array('B')
+    name_ends = array('Q')
+    path_steps = array('Q', [0])
+    positions = array('Q')
+    step_node_ids = array('Q')
+    reverse = array('B')
+    node_order = array('Q')
+    for path_handle in collect.path_handles:
+        names.frombytes(odgi_graph.get_path_name(path_handle).encode('utf-8'))
+        name_ends.append(len(names))
+        for part, path_part in zip((positions, step_node_ids, reverse, node_order),
+                                   PathStepIndex(odgi_graph, path_handle).arrays()):
+            part.extend(path_part)
+        path_steps.append(len(step_node_ids))
+    sections.extend([('path_names', names), ('path_name_ends', name_ends), ('path_steps', path_steps),
+                     ('step_positions', positions), ('step_node_ids', step_node_ids), ('step_reverse', reverse),
+                     ('step_node_order', node_order)])
+    edge_count = GraphStatistics(odgi_graph).edge_count
+    size, mtime, checksum = odgi_signature(odgi_file)
+    table = []
+    offset = header.size + len(sections) * section.size
+    for name, part in sections:
+        offset = offset + -offset % 8
+        table.append(section.pack(name.encode('ascii'), part.typecode.encode('ascii'), offset, len(part)))
+        offset = offset + len(part) * part.itemsize
+    with open(file_name + '.tmp', 'wb') as out:
+        out.write(header.pack(MAGIC, VERSION, len(sections), size, mtime, checksum, edge_count,
+                              sys.byteorder.encode('ascii')))
+        out.write(b''.join(table))
+        for name, part in sections:
+            out.write(bytes(-out.tell() % 8))
+            out.write(part.tobytes())
+    # readers never see a half written sidecar
+    os.replace(file_name + '.tmp', file_name)
+    return file_name
+
+
+class Sidecar:
+    """\
+    The sidecar of an odgi file, memory mapped. The sections are memory views of the mapped
+    pages, nothing is copied when it is loaded.
+    """
+
+    def __init__(self, file_name: str):
+        with open(file_name, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views = []
+        self._sections = {}
+        self._paths = None
+        try:
+            self._read_sections(file_name)
+        except (ValueError, TypeError, struct.error):
+            self.close()
+            raise
+
+    def _read_sections(self, file_name: str):
+        magic, version, section_count, self.odgi_size, self.odgi_mtime, self.odgi_checksum, self.edge_count, \
+            byte_order = header.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{file_name} is not a sidecar of version {VERSION}')
+        byte_order = byte_order.rstrip(b'\0').decode('ascii', 'replace')
+        if byte_order != sys.byteorder:
+            raise ValueError(f'{file_name} is {byte_order} endian, this host is {sys.byteorder} endian')
+        whole = memoryview(self._map)
+        self._views.append(whole)
+        for i in range(section_count):
+            name, typecode, offset, count = section.unpack_from(self._map, header.size + i * section.size)
+            typecode = typecode.rstrip(b'\0').decode('ascii')
+            end = offset + count * array(typecode).itemsize
+            if end > len(self._map):
+                raise ValueError(f'{file_name} is cut short')
+            view = whole[offset:end].cast(typecode)
+            self._views.append(view)
+            self._sections[name.rstrip(b'\0').decode('ascii')] = view
+        missing = {'node_lengths', 'path_names', 'path_name_ends', 'path_steps', 'step_positions', 'step_node_ids',
+                   'step_reverse', 'step_node_order'} - self._sections.keys()
+        if missing or not ('node_ids' in self._sections or 'node_id_range' in self._sections):
+            raise ValueError(f'{file_name} lacks sections')
+
+    @classmethod
+    def load(cls, odgi_file: str):
+        """\
+        The sidecar beside the odgi file, None if there is none, if it was built from an other version
+        of the file, or if it can not be read. Then the store builds its indexes from the graph.
+        """
+        file_name = sidecar_file(odgi_file)
+        if not os.path.exists(file_name):
+            return None
+        try:
+            sidecar = cls(file_name)
+        except (OSError, ValueError, TypeError, struct.error) as e:
+            warnings.warn(f'ignoring the sidecar {file_name}: {e}')
+            return None
+        if (sidecar.odgi_size, sidecar.odgi_mtime, sidecar.odgi_checksum) != odgi_signature(odgi_file):
+            sidecar.close()
+            return None
+        return sidecar
+
+    def close(self):
+        # the map can only be closed once nothing points into it anymore
+        for view in self._views:
+            view.release()
+        try:
+            self._map.close()
+        except BufferError:
+            # a slice is still held elsewhere, the map is closed when that is gone
+            pass
+
+    def _view(self, part):
+        self._views.append(part)
+        return part
+
+    def node_ids(self, odgi_graph: odgi):
+        id_range = self._sections.get('node_id_range')
+        if id_range is not None:
+            return NodeIds(odgi_graph, range(id_range[0], id_range[1]))
+        return NodeIds(odgi_graph, self._sections['node_ids'])
+
+    def node_lengths(self, odgi_graph: odgi, node_ids: NodeIds):
+        return NodeLengths(odgi_graph, node_ids, self._sections['node_lengths'])
+
+    def step_count(self):
+        """The number of steps of all paths together"""
+        return self._sections['path_steps'][-1]
+
+    def path_names(self):
+        """The names of the paths, in the order in which odgi lists them"""
+        if self._paths is None:
+            names = self._sections['path_names']
+            ends = self._sections['path_name_ends']
+            self._paths = {}
+            begin = 0
+            for i, end in enumerate(ends):
+                self._paths[bytes(names[begin:end]).decode('utf-8')] = i
+                begin = end
+        return self._paths.keys()
+
+    def step_index(self, odgi_graph: odgi, path_handle: odgi.path_handle):
+        """The step index of the path from the arrays in the sidecar, None if the sidecar does not have the path"""
+        self.path_names()
+        i = self._paths.get(odgi_graph.get_path_name(path_handle))
+        if i is None:
+            return None
+        sections = self._sections
+        begin = sections['path_steps'][i]
+        end = sections['path_steps'][i + 1]
+        # each path has one position more than it has steps
+        return PathStepIndex(odgi_graph, path_handle,
+                             positions=self._view(sections['step_positions'][begin + i:end + i + 1]),
+                             node_ids=self._view(sections['step_node_ids'][begin:end]),
+                             reverse=self._view(sections['step_reverse'][begin:end]),
+                             node_order=self._view(sections['step_node_order'][begin:end]))
@@ -0,0 +1,39 @@
+"""
+The time the command line tools take to start, for their --profile-startup report.
+
+The tools import rdflib and the store only once their options are parsed, so that the time
+to the first result can be split into the imports, opening the graph, preparing the query
+and evaluating it up to the first solution.
+
+* :class:`Startup profile <StartupProfile>`
+"""
+
+import sys
+import time
+
+__all__ = [
+    'StartupProfile'
+]
+
+
+class StartupProfile:
+    """\
+    The steps of the start of a tool, with the time each took and the time since the tool
+    started. Marks are ignored, and nothing is reported, unless it is enabled.
+    """
+
+    def __init__(self, enabled: bool, started: float = None):
+        self.enabled = enabled
+        self.started = time.perf_counter() if started is None else started
+        self.last = self.started
+        self.steps = []
+
+    def mark(self, step: str):
+        if self.enabled:
+            now = time.perf_counter()
+            self.steps.append((step, now - self.last, now - self.started))
+            self.last = now
+
+    def report(self, out=sys.stderr):
+        for step, took, since_start in self.steps:
+            print(f'{step}\t{took:.3f}s\t{since_start:.3f}s', file=out)
@@ -0,0 +1,78 @@
+"""
+This module defines the counts of an odgi graph that the store uses to estimate how many
+triples match a pattern, and to describe itself in VoID.
+
+* :class:`Graph statistics <GraphStatistics>`
+"""
+
+import odgi
+
+__all__ = [
+    'GraphStatistics'
+]
+
+
+class CountEdges:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, edge):
+        self.count = self.count + 1
+        return True
+
+
+class CollectPathHandles:
+    def __init__(self):
+        self.path_handles = []
+
+    def __call__(self, path_handle):
+        self.path_handles.append(path_handle)
+
+
+class GraphStatistics:
+    """\
+    Node and path counts, taken when the store is opened. Counting the edges needs a pass over
+    all edges, and counting the steps one over all paths, so those are done the first time they
+    are asked for, unless they were known already from a sidecar file.
+    """
+
+    def __init__(self, odgi_graph: odgi, edge_count: int = None, step_count: int = None):
+        self._odgi = odgi_graph
+        self._edge_count = edge_count
+        self._step_count = step_count
+        self._path_step_counts = None
+        self.node_count = odgi_graph.get_node_count()
+        self.path_count = odgi_graph.get_path_count()
+
+    @property
+    def path_step_counts(self):
+        """The number of steps of each path, by the name of the path"""
+        if self._path_step_counts is None:
+            collect = CollectPathHandles()
+            self._odgi.for_each_path_handle(collect)
+            self._path_step_counts = {}
+            for path_handle in collect.path_handles:
+                self._path_step_counts[self._odgi.get_path_name(path_handle)] = \
+                    self._odgi.get_step_count(path_handle)
+        return self._path_step_counts
+
+    @property
+    def step_count(self):
+        if self._step_count is None:
+            self._step_count = sum(self.path_step_counts.values())
+        return self._step_count
+
+    @property
+    def edge_count(self):
+        """The number of edges, each once, as the vg:links triples are generated"""
+        if self._edge_count is None:
+            counter = CountEdges()
+            self._odgi.for_each_edge(counter)
+            self._edge_count = counter.count
+        return self._edge_count
+
+    def average_node_depth(self):
+        """The average number of steps on a node"""
+        if self.node_count == 0:
+            return 0
+        return self.step_count / self.node_count
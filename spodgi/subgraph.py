@@ -0,0 +1,87 @@
+"""
+Extraction of the subgraph around some nodes, in one pass over the odgi graph.
+
+The nodes are found by a traversal from the given nodes, see OdgiStore.neighbourhood. For
+each of them the node and the edges to the other nodes of the subgraph are written, then the
+steps that visit them, found from the node over the step index of each path, and last the
+paths those steps are on. The triples are the same as those that a full scan of the store
+gives for those nodes, steps and paths, and are written as N-Triples terms, straight from the
+odgi handles, as the exporter does.
+
+* :func:`The triples of a subgraph <subgraph_triples>`
+* :func:`Write a subgraph <write_subgraph>`
+"""
+
+from rdflib.term import URIRef
+from spodgi.OdgiStore import OrientEdges
+from spodgi.export import iri, path_iri, write_node, write_step, rdf_type, vg_path_type
+from spodgi.term import step_prefix, position_prefix
+
+__all__ = [
+    'node_id_from',
+    'subgraph_triples',
+    'write_subgraph'
+]
+
+
+class CollectTriples:
+    def __init__(self):
+        self.triples = []
+
+    def triple(self, s: str, p: str, o: str):
+        self.triples.append((s, p, o))
+
+
+def node_id_from(store, value: str):
+    """The id of a node given as a number or as its IRI, with or without angle brackets"""
+    if value.isdigit():
+        return int(value)
+    node_id = store.node_id_of(URIRef(value.strip('<>')))
+    if node_id is None:
+        raise ValueError(f'{value} is not a node of the graph')
+    return node_id
+
+
+def subgraph_triples(store, node_ids, steps: bool = True):
+    """\
+    The (subject, predicate, object) N-Triples terms of the nodes, the edges between them and, with steps,
+    of the steps that visit them and the paths of those steps. They are generated as they are written,
+    a node or a step at a time.
+    """
+    odgi_graph = store.odgi_graph
+    base = store.base
+    collected = CollectTriples()
+    orient = OrientEdges(odgi_graph)
+    for node_id in sorted(node_ids):
+        write_node(odgi_graph, base, collected, odgi_graph.get_handle(node_id), orient, node_ids)
+        yield from collected.triples
+        collected.triples.clear()
+    if not steps:
+        return
+    ranks_by_path = {}
+    for node_id in sorted(node_ids):
+        node_iri = store.node_iri(odgi_graph.get_handle(node_id))
+        for path_ref, step_index, ranks in store.step_ranks(node=node_iri):
+            ranks_by_path.setdefault(path_ref.unicode(), (step_index, []))[1].extend(ranks)
+    # the paths in the order of a full scan
+    paths = [path_ref for path_ref in store.matching_paths(None) if path_ref.unicode() in ranks_by_path]
+    for path_ref in paths:
+        step_index, ranks = ranks_by_path[path_ref.unicode()]
+        path_name = odgi_graph.get_path_name(path_ref.path())
+        path = iri(path_iri(path_name, base))
+        step_iris = step_prefix(path_name, base)
+        position_iris = position_prefix(path_name, base)
+        for rank in sorted(ranks):
+            node_handle = step_index.node_handle(rank)
+            write_step(odgi_graph, base, collected, node_handle, path, step_iris, position_iris, rank,
+                       step_index.position(rank))
+            yield from collected.triples
+            collected.triples.clear()
+    for path_ref in paths:
+        yield iri(path_iri(odgi_graph.get_path_name(path_ref.path()), base)), rdf_type, vg_path_type
+
+
+def write_subgraph(store, node_ids, writer, steps: bool = True):
+    """Passes the triples of the subgraph of the nodes to the writer, see :func:`subgraph_triples`"""
+    for s, p, o in subgraph_triples(store, node_ids, steps):
+        writer.triple(s, p, o)
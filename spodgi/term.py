@@ -10,7 +10,7 @@ passing references.
 
 from rdflib.term import URIRef
 import odgi
-from urllib.parse import urlparse
+import re
 
 __all__ = [
     'NodeIriRef',
@@ -20,17 +20,37 @@ __all__ = [
     'PathIriRef'
 ]
 
+# path names that are already IRIs are used as is, others are placed under the base
+iri_path_name = re.compile('https?://')
+
+
+def step_prefix(path_name: str, base: str):
+    if iri_path_name.match(path_name):
+        return f'{path_name}-step-'
+    else:
+        return f'{base}path/{path_name}/step/'
+
+
+def position_prefix(path_name: str, base: str):
+    if iri_path_name.match(path_name):
+        return f'{path_name}-p'
+    else:
+        return f'{base}path/{path_name}/position/'
+
 
 class StepIriRef(URIRef):
-    __slots__ = ("_stepHandle", "_base", "_odgi", "_position", "_rank")
+    __slots__ = ("_stepHandle", "_base", "_odgi", "_position", "_rank", "_pathIri", "_iri", "_hash")
 
-    def __new__(cls, step_handle: odgi.step_handle, base: str, odgi: odgi, position, rank):
+    def __new__(cls, step_handle: odgi.step_handle, base: str, odgi: odgi, position, rank, path_iri=None):
         inst = str.__new__(cls)
         inst._stepHandle = step_handle
         inst._base = base
         inst._odgi = odgi
         inst._rank = rank
         inst._position = position
+        inst._pathIri = path_iri
+        inst._iri = None
+        inst._hash = None
         return inst
 
     def __eq__(self, other):
@@ -38,7 +58,7 @@ class StepIriRef(URIRef):
         if StepIriRef == type(other):
             return self._stepHandle == other.step_handle() and self.position() == other.position()
         elif isinstance(other, URIRef):
-            return URIRef(self.unicode()) == other
+            return self.unicode() == str(other)
         else:
             return False
 
@@ -84,16 +104,26 @@ class StepIriRef(URIRef):
     def base(self):
         return self._base
 
+    def path_iri(self):
+        return self._pathIri
+
     def toPython(self):
         return self.unicode()
 
     def unicode(self):
+        if self._iri is None:
+            if self._pathIri is not None:
+                self._iri = f'{self._pathIri.step_prefix()}{self._rank}'
+            else:
+                path_name = self._odgi.get_path_name(self._odgi.get_path_handle_of_step(self._stepHandle))
+                self._iri = f'{step_prefix(path_name, self._base)}{self._rank}'
+        return self._iri
+
+    def position_prefix(self):
+        if self._pathIri is not None:
+            return self._pathIri.position_prefix()
         path_name = self._odgi.get_path_name(self._odgi.get_path_handle_of_step(self._stepHandle))
-        try:
-            result = urlparse(path_name)
-            return f'{path_name}-step-{self._rank}'
-        except ValueError:
-            return f'{self._base}path/{path_name}/step/{self._rank}'
+        return position_prefix(path_name, self._base)
 
     def __str__(self):
         return self.unicode()
@@ -102,24 +132,29 @@ class StepIriRef(URIRef):
         return 'odgi(\'' + self.unicode() + '\')'
 
     def __hash__(self):
-        return hash(self.unicode())
+        if self._hash is None:
+            self._hash = hash(self.unicode())
+        return self._hash
 
 
 class NodeIriRef(URIRef):
-    __slots__ = ("_nodeHandle", "_base", "_odgi")
+    __slots__ = ("_nodeHandle", "_base", "_odgi", "_iri", "_hash")
 
     def __new__(cls, node_handle: odgi.handle, base: str = None, odgi_graph: odgi = None):
         inst = str.__new__(cls)
         inst._nodeHandle = node_handle
         inst._base = base
         inst._odgi = odgi_graph
+        inst._iri = None
+        inst._hash = None
         return inst
 
     def __eq__(self, other):
+        # the same node is found as a forward and as a reverse handle, but it has the one IRI
         if NodeIriRef == type(other):
-            return self._nodeHandle == other.node_handle() and self._base == other.base()
-        elif type(other) == URIRef:
-            return URIRef(self.unicode()) == other
+            return self.unicode() == other.unicode()
+        elif isinstance(other, URIRef):
+            return self.unicode() == str(other)
         else:
             return False
 
@@ -146,8 +181,9 @@ class NodeIriRef(URIRef):
         return self.unicode()
 
     def unicode(self):
-        nid = self._odgi.get_id(self._nodeHandle);
-        return f'{self._base}node/{nid}'
+        if self._iri is None:
+            self._iri = f'{self._base}node/{self._odgi.get_id(self._nodeHandle)}'
+        return self._iri
 
     def __str__(self):
         return self.unicode()
@@ -156,7 +192,9 @@ class NodeIriRef(URIRef):
         return 'odgi.NodeIriRef(\'' + self.unicode() + '\')'
 
     def __hash__(self):
-        return hash(self.unicode())
+        if self._hash is None:
+            self._hash = hash(self.unicode())
+        return self._hash
 
     def node_handle(self):
         return self._nodeHandle
@@ -173,11 +211,13 @@ the offset of the step.
 
 
 class StepBeginIriRef(URIRef):
-    __slots__ = "_stepIri"
+    __slots__ = ("_stepIri", "_iri", "_hash")
 
     def __new__(cls, step_iri: StepIriRef):
         inst = str.__new__(cls)
         inst._stepIri = step_iri
+        inst._iri = None
+        inst._hash = None
         return inst
 
     def __eq__(self, other):
@@ -189,7 +229,7 @@ class StepBeginIriRef(URIRef):
             res = self.step_iri().path() == other.step_iri().path() and self.position() == other.position()
             return res
         elif isinstance(other, URIRef):
-            return URIRef(self.unicode()) == other
+            return self.unicode() == str(other)
         else:
             return False
 
@@ -218,13 +258,9 @@ class StepBeginIriRef(URIRef):
         return self.unicode()
 
     def unicode(self):
-        path_name = self._stepIri.odgi().get_path_name(
-            self._stepIri.odgi().get_path_handle_of_step(self.step_handle()))
-        try:
-            result = urlparse(path_name)
-            return f'{path_name}-p{self.position()}'
-        except ValueError:
-            return f'{self._stepIri.base()}path/{path_name}/position/{self.position()}'
+        if self._iri is None:
+            self._iri = f'{self._stepIri.position_prefix()}{self.position()}'
+        return self._iri
 
     def __str__(self):
         return self.unicode()
@@ -233,7 +269,9 @@ class StepBeginIriRef(URIRef):
         return 'odgi.StepBeginIriRef(\'' + self.unicode() + '\')'
 
     def __hash__(self):
-        return hash(self.unicode())
+        if self._hash is None:
+            self._hash = hash(self.unicode())
+        return self._hash
 
 
 """
@@ -243,11 +281,14 @@ the offset of the step plus the length of the representative node.
 
 
 class StepEndIriRef(URIRef):
-    __slots__ = "_stepIri"
+    __slots__ = ("_stepIri", "_position", "_iri", "_hash")
 
     def __new__(cls, step_iri: StepIriRef):
         inst = str.__new__(cls)
         inst._stepIri = step_iri
+        inst._position = None
+        inst._iri = None
+        inst._hash = None
         return inst
 
     def __eq__(self, other):
@@ -259,7 +300,7 @@ class StepEndIriRef(URIRef):
             res = self.step_iri().path() == other.step_iri().path() and self.position() == other.position();
             return res
         elif isinstance(other, URIRef):
-            return URIRef(self.unicode()) == other
+            return self.unicode() == str(other)
         else:
             return False
     #
@@ -289,8 +330,10 @@ class StepEndIriRef(URIRef):
         return self._stepIri.rank()
 
     def position(self):
-        return self._stepIri.position() + self._stepIri.odgi().get_length(
-            self._stepIri.odgi().get_handle_of_step(self._stepIri.step_handle()))
+        if self._position is None:
+            self._position = self._stepIri.position() + self._stepIri.odgi().get_length(
+                self._stepIri.odgi().get_handle_of_step(self._stepIri.step_handle()))
+        return self._position
 
     def path(self):
         return self._stepIri.path()
@@ -299,14 +342,9 @@ class StepEndIriRef(URIRef):
         return self.unicode()
 
     def unicode(self):
-        end = self.position()
-        path_name = self._stepIri.odgi().get_path_name(
-            self._stepIri.odgi().get_path_handle_of_step(self._stepIri.step_handle()))
-        try:
-            result = urlparse(path_name)
-            return f'{path_name}-p{end}'
-        except ValueError:
-            return f'{self._stepIri.base()}path/{path_name}/position/{end}'
+        if self._iri is None:
+            self._iri = f'{self._stepIri.position_prefix()}{self.position()}'
+        return self._iri
 
     def __str__(self):
         return self.unicode()
@@ -315,16 +353,21 @@ class StepEndIriRef(URIRef):
         return 'odgi.StepEndIriRef(\'' + self.unicode() + '\')'
 
     def __hash__(self):
-        return hash(self.unicode())
+        if self._hash is None:
+            self._hash = hash(self.unicode())
+        return self._hash
 
 
 class PathIriRef(URIRef):
-    __slots__ = ("_uri", "_pathHandle")
+    __slots__ = ("_uri", "_pathHandle", "_stepPrefix", "_positionPrefix", "_hash")
 
-    def __new__(cls, uri, path_handle: odgi.path_handle):
+    def __new__(cls, uri, path_handle: odgi.path_handle, step_prefix: str = None, position_prefix: str = None):
         inst = str.__new__(cls)
         inst._uri = uri
         inst._pathHandle = path_handle
+        inst._stepPrefix = step_prefix if step_prefix is not None else f'{uri}/step/'
+        inst._positionPrefix = position_prefix if position_prefix is not None else f'{uri}/position/'
+        inst._hash = hash(uri)
         return inst
 
     def __eq__(self, other):
@@ -332,7 +375,7 @@ class PathIriRef(URIRef):
         if PathIriRef == type(other):
             return self._pathHandle == other.path()
         elif isinstance(other, URIRef):
-            return URIRef(self.unicode()) == other
+            return self._uri == str(other)
         else:
             return False
 
@@ -368,7 +411,13 @@ class PathIriRef(URIRef):
         return 'odgi.PathIriRef(\'' + self.unicode() + '\')'
 
     def __hash__(self):
-        return hash(self.unicode())
+        return self._hash
+
+    def step_prefix(self):
+        return self._stepPrefix
+
+    def position_prefix(self):
+        return self._positionPrefix
 
     def uri(self):
         return self._uri
\ No newline at end of file
@@ -0,0 +1,123 @@
+"""
+Native evaluation of property paths over the edges of the graph, such as vg:links+,
+^vg:links* or (vg:linksForwardToForward|vg:linksForwardToReverse)?.
+
+rdflib evaluates a property path by calling triples() for every hop, which wraps every
+neighbour in new terms. An :class:`EdgePath` stands in for such a path in a basic graph
+pattern and answers it with a traversal of the odgi graph instead, over node ids.
+
+* :class:`Edge property path <EdgePath>`
+* :func:`Recognise an edge property path <edge_path>`
+"""
+
+from rdflib.paths import AlternativePath, InvPath, MulPath, Path, OneOrMore, ZeroOrMore, ZeroOrOne
+from rdflib.term import URIRef
+from spodgi.OdgiStore import edgePredicates
+
+__all__ = [
+    'EdgePath',
+    'edge_path'
+]
+
+
+class EdgePath(Path):
+    """\
+    A property path of one or more edge predicates, optionally inverse, and optionally repeated.
+    It gives the same solutions as the path it stands in for, which it also keeps to print itself.
+    """
+
+    def __init__(self, path, predicates, inverse: bool = False, min_depth: int = 1, max_depth: int = 1,
+                 repeated: bool = False):
+        self.path = path
+        self.predicates = predicates
+        self.inverse = inverse
+        self.min_depth = min_depth
+        self.max_depth = max_depth
+        # the solutions of a repeated path, even with ?, are distinct
+        self.repeated = repeated
+
+    def eval(self, graph, subj=None, obj=None):
+        store = graph.store
+        if subj is None and obj is None and self.min_depth == 0:
+            # every term in the graph is a zero length solution, not only the nodes
+            yield from self.path.eval(graph, subj, obj)
+            return
+        if subj is not None:
+            if self.min_depth == 0 and (obj is None or obj == subj):
+                yield subj, subj
+            for other in self.linked(store, subj, self.inverse):
+                if obj is None or obj == other:
+                    yield subj, other
+        elif obj is not None:
+            if self.min_depth == 0:
+                yield obj, obj
+            for other in self.linked(store, obj, not self.inverse):
+                yield other, obj
+        else:
+            for handle in store.handles():
+                node = store.node_iri(handle)
+                for other in self.linked(store, node, self.inverse):
+                    yield node, other
+
+    def linked(self, store, node, inverse: bool):
+        """The nodes linked to the node, without the node itself for a zero length path"""
+        node_id = store.node_id_of(node)
+        if node_id is None:
+            return
+        if not self.repeated:
+            # a single step gives a solution for every matching triple, as rdflib does for an alternative
+            other_ids = store.linked_node_ids(node_id, self.predicates, inverse)
+        else:
+            other_ids = (other_id for other_id, depth in
+                         store.reachable_node_ids([node_id], self.predicates, inverse, max_depth=self.max_depth)
+                         if not (self.min_depth == 0 and other_id == node_id))
+        for other_id in other_ids:
+            yield store.node_iri(store.odgi_graph.get_handle(other_id))
+
+    def n3(self, namespace_manager=None):
+        return self.path.n3(namespace_manager)
+
+    def __repr__(self):
+        return repr(self.path)
+
+
+def edge_predicates(path):
+    """The edge predicates of a predicate or of an alternative of predicates, None for any other path"""
+    if isinstance(path, URIRef) and path in edgePredicates:
+        return [path]
+    elif isinstance(path, AlternativePath) and all(isinstance(a, URIRef) and a in edgePredicates for a in path.args):
+        return list(path.args)
+    return None
+
+
+def edge_path(path):
+    """\
+    An EdgePath for a property path over the edges only, None for anything else. A predicate on its
+    own is not a property path and is left to triples().
+    """
+    if not isinstance(path, Path):
+        return None
+    inverse = False
+    min_depth = 1
+    max_depth = 1
+    repeated = False
+    inner = path
+    if isinstance(inner, InvPath):
+        inverse = True
+        inner = inner.arg
+    if isinstance(inner, MulPath):
+        repeated = True
+        if inner.mod == ZeroOrMore:
+            min_depth, max_depth = 0, None
+        elif inner.mod == OneOrMore:
+            min_depth, max_depth = 1, None
+        elif inner.mod == ZeroOrOne:
+            min_depth, max_depth = 0, 1
+        inner = inner.path
+    if isinstance(inner, InvPath):
+        inverse = not inverse
+        inner = inner.arg
+    predicates = edge_predicates(inner)
+    if predicates is None:
+        return None
+    return EdgePath(path, predicates, inverse, min_depth, max_depth, repeated)
@@ -0,0 +1,41 @@
+#!/usr/bin/python3
+import click
+from spodgi import OdgiStore
+from spodgi import export
+from spodgi.subgraph import node_id_from, write_subgraph
+from rdflib.store import Store
+from rdflib import Graph
+from rdflib import plugin
+
+@click.command()
+@click.argument('odgifile')
+@click.argument('output')
+@click.option('--node', 'nodes', multiple=True, required=True, help='Id or IRI of a node to take the neighbourhood of, can be given more than once')
+@click.option('--hops', type=click.IntRange(min=0), help='Number of edges from the nodes that the subgraph reaches')
+@click.option('--distance', type=click.IntRange(min=0), help='Number of bases from the nodes that the subgraph reaches')
+@click.option('--one-way', is_flag=True, help='Only follow the edges in their direction, instead of both ways')
+@click.option('--without-steps', is_flag=True, help='Leave out the steps of the paths through the subgraph')
+@click.option('--base', default='http://example.org/vg/')
+@click.option('--syntax', type=click.Choice(['ntriples', 'nt', 'turtle', 'ttl']), default='ntriples')
+@click.option('--compression', type=click.Choice(['gzip', 'xz', 'zstd']), help='Compression of the output, by default from the suffix of OUTPUT (.gz, .xz or .zst)')
+def main(odgifile, output, nodes, hops, distance, one_way, without_steps, base, syntax, compression):
+    """Writes the nodes within --hops edges and --distance bases of the given nodes, with the steps through them, as RDF to OUTPUT, '-' for standard out"""
+    plugin.register('OdgiStore', Store,'spodgi.OdgiStore', 'OdgiStore')
+    store = plugin.get('OdgiStore', Store)(base=base)
+    spodgi = Graph(store=store)
+    spodgi.open(odgifile, create=False)
+    try:
+        node_ids = store.neighbourhood([node_id_from(store, node) for node in nodes], hops, distance, not one_way)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--node')
+    if compression is None:
+        compression = export.compression_of(output)
+    out = export.Output(output, compression)
+    writer = export.new_writer(out, syntax, base)
+    write_subgraph(store, node_ids, writer, not without_steps)
+    writer.close()
+    out.close()
+    spodgi.close()
+
+if __name__ == "__main__":
+    main()
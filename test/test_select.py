@@ -3,6 +3,7 @@ import io
 from spodgi import OdgiStore
 
 from rdflib.namespace import RDF
+from rdflib.term import URIRef, Variable
 from rdflib.store import Store
 from rdflib import Graph
 from rdflib import plugin
@@ -170,3 +171,811 @@ def test_select_specific_sequence():
 
     spodgi.close()
     assert True
+
+
+def test_select_step_by_rank():
+    plugin.register('OdgiStore', Store, 'spodgi.OdgiStore', 'OdgiStore')
+    s = plugin.get('OdgiStore', Store)(base="http://example.org/test/")
+    spodgi = Graph(store=s)
+    spodgi.open('./test/t.odgi', create=False)
+    count = 0
+    for r in spodgi.query('''PREFIX vg:<http://biohackathon.org/resource/vg#>
+    SELECT ?rank ?position WHERE {<http://example.org/test/path/x/step/4> vg:rank ?rank ; vg:position ?position}'''):
+        assert r[0].value == 4
+        assert r[1].value == 11
+        count = count + 1
+    assert count == 1
+    for r in spodgi.query('''PREFIX vg:<http://biohackathon.org/resource/vg#>
+    SELECT ?rank WHERE {<http://example.org/test/path/x/step/11> vg:rank ?rank}'''):
+        assert False
+
+    spodgi.close()
+    assert True
+
+
+def test_select_position_on_path():
+    plugin.register('OdgiStore', Store, 'spodgi.OdgiStore', 'OdgiStore')
+    s = plugin.get('OdgiStore', Store)(base="http://example.org/test/")
+    spodgi = Graph(store=s)
+    spodgi.open('./test/t.odgi', create=False)
+    for r in spodgi.query('''PREFIX faldo:<http://biohackathon.org/resource/faldo#>
+    SELECT (count(distinct ?pos) as ?count)
+    WHERE {?pos faldo:position 11 ; faldo:reference <http://example.org/test/path/x>}'''):
+        assert r[0].value == 1
+    for r in spodgi.query('''PREFIX faldo:<http://biohackathon.org/resource/faldo#>
+    SELECT ?p WHERE {<http://example.org/test/path/x/position/11> faldo:position ?p}'''):
+        assert r[0].value == 11
+
+    spodgi.close()
+    assert True
+
+
+def test_steps_in_range():
+    plugin.register('OdgiStore', Store, 'spodgi.OdgiStore', 'OdgiStore')
+    s = plugin.get('OdgiStore', Store)(base="http://example.org/test/")
+    spodgi = Graph(store=s)
+    spodgi.open('./test/t.odgi', create=False)
+    ranks = [step.rank() for step in s.steps_in_range(URIRef('http://example.org/test/path/x'), 9, 11)]
+    assert ranks == [2, 3, 4]
+    for r in spodgi.query('''PREFIX faldo:<http://biohackathon.org/resource/faldo#>
+    SELECT (count(distinct ?step) as ?count)
+    WHERE {?step faldo:begin/faldo:position ?b ; faldo:end/faldo:position ?e . FILTER(?b <= 11 && ?e > 9)}'''):
+        assert r[0].value == 3
+
+    spodgi.close()
+    assert True
+
+
+def test_select_steps_of_node():
+    plugin.register('OdgiStore', Store, 'spodgi.OdgiStore', 'OdgiStore')
+    s = plugin.get('OdgiStore', Store)(base="http://example.org/test/")
+    spodgi = Graph(store=s)
+    spodgi.open('./test/t.odgi', create=False)
+    count = 0
+    for r in spodgi.query('''PREFIX vg:<http://biohackathon.org/resource/vg#>
+    SELECT ?rank ?position WHERE {?step vg:node <http://example.org/test/node/5> ; vg:rank ?rank ; vg:position ?position}'''):
+        assert r[0].value == 3
+        assert r[1].value == 10
+        count = count + 1
+    assert count == 1
+    for r in spodgi.query('''PREFIX vg:<http://biohackathon.org/resource/vg#>
+    SELECT ?step WHERE {?step vg:node <http://example.org/test/node/2>}'''):
+        assert False
+
+    spodgi.close()
+    assert True
+
+
+def test_step_orientation():
+    plugin.register('OdgiStore', Store, 'spodgi.OdgiStore', 'OdgiStore')
+    s = plugin.get('OdgiStore', Store)(base="http://example.org/test/")
+    spodgi = Graph(store=s)
+    spodgi.open('./test/t.odgi', create=False)
+    node = URIRef('http://biohackathon.org/resource/vg#node')
+    reverse_of_node = URIRef('http://biohackathon.org/resource/vg#reverseOfNode')
+    path_iri = next(iter(s.matching_paths(None)))
+    step = s.odgi_graph.path_begin(path_iri.path())
+    forward = s.odgi_graph.get_handle(s.odgi_graph.get_id(s.odgi_graph.get_handle_of_step(step)))
+    node_iri = str(s.node_iri(forward))
+    # a step on a node in reverse is the reverse of that node, and not on it as well
+    for handle, predicate in ((forward, node), (s.odgi_graph.flip(forward), reverse_of_node)):
+        found = [(p, str(o)) for (_, p, o), _ in s.step_handle_to_triples(step, None, None, None, handle, 0, 0, path_iri)]
+        assert (predicate, node_iri) in found
+        assert (({node, reverse_of_node} - {predicate}).pop(), node_iri) not in found
+        for asked in (node, reverse_of_node):
+            found = [(p, str(o)) for (_, p, o), _ in s.step_handle_to_triples(step, None, asked, None, handle, 0, 0,
+                                                                              path_iri)]
+            assert found == ([(asked, node_iri)] if asked == predicate else [])
+    # no step is both
+    on_node = set(str(t[0]) for t, c in s.triples((None, node, None)))
+    assert not on_node & set(str(t[0]) for t, c in s.triples((None, reverse_of_node, None)))
+    spodgi.close()
+
+
+def test_select_step_table():
+    plugin.register('OdgiStore', Store, 'spodgi.OdgiStore', 'OdgiStore')
+    s = plugin.get('OdgiStore', Store)(base="http://example.org/test/")
+    spodgi = Graph(store=s)
+    spodgi.open('./test/t.odgi', create=False)
+    count = 0
+    for r in spodgi.query('''PREFIX vg:<http://biohackathon.org/resource/vg#>
+    SELECT ?step ?node ?path ?rank ?position
+    WHERE {?step vg:node ?node ; vg:path ?path ; vg:rank ?rank ; vg:position ?position}
+    ORDER BY ?rank'''):
+        count = count + 1
+        assert r[3].value == count
+        assert r[2] == URIRef('http://example.org/test/path/x')
+    assert count == 10
+
+    spodgi.close()
+    assert True
+
+
+def test_statistics():
+    plugin.register('OdgiStore', Store, 'spodgi.OdgiStore', 'OdgiStore')
+    s = plugin.get('OdgiStore', Store)(base="http://example.org/test/")
+    spodgi = Graph(store=s)
+    spodgi.open('./test/t.odgi', create=False)
+    assert s.statistics.node_count == 15
+    assert s.statistics.path_count == 1
+    assert s.statistics.step_count == 10
+    assert s.cardinality((None, RDF.type, URIRef('http://biohackathon.org/resource/vg#Step'))) == 10
+    assert s.cardinality((None, RDF.value, None)) == 15
+    assert len(s.void_description()) > 0
+
+    spodgi.close()
+    assert True
+
+
+def test_cardinality_of_bound_variables():
+    from rdflib.plugins.sparql.sparql import QueryContext
+    from spodgi.evaluation import order_by_cardinality, planned_pattern
+    plugin.register('OdgiStore', Store, 'spodgi.OdgiStore', 'OdgiStore')
+    s = plugin.get('OdgiStore', Store)(base="http://example.org/test/")
+    spodgi = Graph(store=s)
+    spodgi.open('./test/t.odgi', create=False)
+    vg = 'http://biohackathon.org/resource/vg#'
+    rank = URIRef(vg + 'rank')
+    step, predicate, value, other = Variable('step'), Variable('p'), Variable('v'), Variable('o')
+    ctx = QueryContext(spodgi)
+    assert planned_pattern(ctx, (step, predicate, value), {step, predicate}) == \
+        ((None, None, None), (True, True, False))
+    assert planned_pattern(ctx, (step, rank, value), set()) == ((None, rank, None), (False, False, False))
+    # a predicate bound by an earlier pattern is one of the predicates, not a property path over the edges
+    assert s.cardinality((None, None, None), (False, True, False)) == \
+        max(1, s.cardinality((None, None, None)) // (len(OdgiStore.knownPredicates) + 1))
+    assert s.cardinality((None, None, None), (True, True, False)) == 1
+    assert s.cardinality((None, rank, None), (True, False, False)) == 1
+    assert s.cardinality((None, rank, None), (False, False, True)) < s.cardinality((None, rank, None))
+    # with ?p and ?v bound the pattern over them is cheaper than a scan of the ranks, not one of all edges
+    triples = [(step, rank, other), (Variable('a'), predicate, value)]
+    assert min(triples, key=lambda t: s.cardinality(*planned_pattern(ctx, t, {predicate, value}))) == triples[1]
+    triples = [(step, rank, value), (step, predicate, other), (Variable('a'), predicate, other)]
+    assert order_by_cardinality(ctx, s, triples) == triples
+    spodgi.close()
+
+
+def test_term_cache():
+    plugin.register('OdgiStore', Store, 'spodgi.OdgiStore', 'OdgiStore')
+    s = plugin.get('OdgiStore', Store)(base="http://example.org/test/")
+    spodgi = Graph(store=s)
+    spodgi.open('./test/t.odgi', create=False)
+    for t in spodgi.triples((None, None, None)):
+        pass
+    assert s.terms.hits > 0
+    assert s.terms.misses > 0
+    assert len(s.terms) <= s.terms.max_entries
+
+    spodgi.close()
+    assert True
+
+
+def test_len_and_count_pushdown():
+    plugin.register('OdgiStore', Store, 'spodgi.OdgiStore', 'OdgiStore')
+    s = plugin.get('OdgiStore', Store)(base="http://example.org/test/")
+    spodgi = Graph(store=s)
+    spodgi.open('./test/t.odgi', create=False)
+    count = 0
+    for t in spodgi.triples((None, None, None)):
+        count = count + 1
+    assert len(s) == count
+    for r in spodgi.query('''PREFIX vg:<http://biohackathon.org/resource/vg#>
+    SELECT (count(*) as ?count) WHERE {?s a vg:Step}'''):
+        assert r[0].value == 10
+    for r in spodgi.query('''PREFIX vg:<http://biohackathon.org/resource/vg#>
+    SELECT (count(*) as ?count) WHERE {?s a vg:Node}'''):
+        assert r[0].value == 15
+
+    spodgi.close()
+    assert True
+
+
+def test_count_pushdown_matches_evaluation():
+    plugin.register('OdgiStore', Store, 'spodgi.OdgiStore', 'OdgiStore')
+    s = plugin.get('OdgiStore', Store)(base="http://example.org/test/")
+    spodgi = Graph(store=s)
+    spodgi.open('./test/t.odgi', create=False)
+    prefixes = 'PREFIX vg:<http://biohackathon.org/resource/vg#> PREFIX faldo:<http://biohackathon.org/resource/faldo#> '
+    patterns = ['?s ?p ?o', '?s a vg:Node', '?s a vg:Path', '?s a vg:Step', '?s a faldo:Region',
+                '?s a faldo:ExactPosition', '?s a faldo:Position', '?s rdf:value ?o', '?s vg:links ?o',
+                '?s vg:rank ?o', '?s vg:position ?o', '?s vg:path ?o', '?s faldo:begin ?o', '?s faldo:end ?o',
+                '?s faldo:position ?o', '?s faldo:reference ?o']
+    for pattern in patterns:
+        # a FILTER keeps the count from being answered from the statistics
+        pushed_down = [r[0].value for r in spodgi.query(f'{prefixes}SELECT (COUNT(*) AS ?c) WHERE {{{pattern}}}')]
+        evaluated = [r[0].value for r in spodgi.query(f'{prefixes}SELECT (COUNT(*) AS ?c) WHERE {{{pattern} FILTER(true)}}')]
+        assert pushed_down == evaluated, pattern
+        predicate, obj = [None if t.startswith('?') else RDF.type if t == 'a' else
+                          spodgi.namespace_manager.expand_curie(t) for t in pattern.split()[1:]]
+        assert s.triple_count(predicate, obj) == evaluated[0], pattern
+    spodgi.close()
+
+
+def test_export_matches_store():
+    plugin.register('OdgiStore', Store, 'spodgi.OdgiStore', 'OdgiStore')
+    s = plugin.get('OdgiStore', Store)(base="http://example.org/test/")
+    spodgi = Graph(store=s)
+    spodgi.open('./test/t.odgi', create=False)
+    from spodgi.export import write_graph
+    out = io.StringIO()
+    write_graph(s.odgi_graph, "http://example.org/test/", out)
+    exported = Graph()
+    exported.parse(data=out.getvalue(), format='nt')
+    scanned = set()
+    for t in spodgi.triples((None, None, None)):
+        scanned.add(tuple(URIRef(str(n)) if isinstance(n, URIRef) else n for n in t))
+    assert set(exported) == scanned
+
+    out = io.StringIO()
+    write_graph(s.odgi_graph, "http://example.org/test/", out, 'turtle')
+    turtle = Graph()
+    turtle.parse(data=out.getvalue(), format='turtle')
+    assert len(turtle) == len(exported)
+    spodgi.close()
+
+
+def test_export_compressed_chunks(tmp_path):
+    import gzip
+    from spodgi.export import export
+    files = export('./test/t.odgi', str(tmp_path / 't.nt.gz'), "http://example.org/test/", triples_per_chunk=100)
+    assert len(files) == 3
+    assert files[0].endswith('t.00000.nt.gz')
+    exported = Graph()
+    for file_name in files:
+        with gzip.open(file_name, 'rt') as chunk:
+            exported.parse(data=chunk.read(), format='nt')
+    assert len(exported) == 195
+
+
+def test_streamed_results():
+    import json
+    from spodgi.results import stream_query
+    plugin.register('OdgiStore', Store, 'spodgi.OdgiStore', 'OdgiStore')
+    s = plugin.get('OdgiStore', Store)(base="http://example.org/test/")
+    spodgi = Graph(store=s)
+    spodgi.open('./test/t.odgi', create=False)
+    query = 'PREFIX vg: <http://biohackathon.org/resource/vg#> SELECT ?step ?rank WHERE {?step vg:rank ?rank}'
+    streamed = json.loads(b''.join(stream_query(spodgi, query, 'json')).decode('utf-8'))
+    assert streamed['head']['vars'] == ['step', 'rank']
+    assert len(streamed['results']['bindings']) == 10
+    tsv = b''.join(stream_query(spodgi, query, 'tsv')).decode('utf-8').splitlines()
+    assert tsv[0] == '?step\t?rank'
+    assert len(tsv) == 11
+    construct = 'PREFIX vg: <http://biohackathon.org/resource/vg#> CONSTRUCT WHERE {?step vg:rank ?rank}'
+    constructed = Graph()
+    constructed.parse(data=b''.join(stream_query(spodgi, construct, 'nt')).decode('utf-8'), format='nt')
+    assert len(constructed) == 10
+    assert stream_query(spodgi, construct, 'xml') is None
+    spodgi.close()
+
+
+def test_result_cache_limits():
+    from spodgi.cache import LruCache
+    from spodgi.results import normalize_query
+    cache = LruCache(3, 10)
+    cache.put('a', b'1234', 4)
+    cache.put('b', b'1234', 4)
+    cache.put('c', b'1234', 4)
+    assert 'a' not in cache
+    assert cache.stats()['bytes'] == 8
+    cache.put('d', b'12345678901', 11)
+    assert 'd' not in cache
+    assert normalize_query('SELECT  *\n WHERE {?s ?p "a  b"} # all') == 'SELECT * WHERE {?s ?p "a  b"}'
+
+
+def test_edge_property_paths():
+    plugin.register('OdgiStore', Store, 'spodgi.OdgiStore', 'OdgiStore')
+    s = plugin.get('OdgiStore', Store)(base="http://example.org/test/")
+    spodgi = Graph(store=s)
+    spodgi.open('./test/t.odgi', create=False)
+    links = URIRef('http://biohackathon.org/resource/vg#links')
+    start = URIRef('http://example.org/test/node/1')
+    # breadth first over the vg:links triples, as rdflib would walk them
+    seen = set()
+    waiting = [start]
+    while waiting:
+        node = waiting.pop()
+        for (_, _, other), _ in s.triples((node, links, None)):
+            if str(other) not in seen:
+                seen.add(str(other))
+                waiting.append(URIRef(str(other)))
+    query = 'PREFIX vg: <http://biohackathon.org/resource/vg#> SELECT ?b WHERE {<http://example.org/test/node/1> vg:links+ ?b}'
+    found = [str(r[0]) for r in spodgi.query(query)]
+    assert len(found) == len(set(found))
+    assert set(found) == seen
+    query = 'PREFIX vg: <http://biohackathon.org/resource/vg#> SELECT ?a WHERE {?a ^vg:links <http://example.org/test/node/1>}'
+    assert set(str(r[0]) for r in spodgi.query(query)) == set(str(t[0][2]) for t in s.triples((start, links, None)))
+    within_one = [node_id for node_id, depth in s.reachable_node_ids([1], max_depth=1)]
+    assert set(within_one) == set(int(str(t[0][2]).split('/')[-1]) for t in s.triples((start, links, None)))
+    spodgi.close()
+
+
+def test_subgraph():
+    plugin.register('OdgiStore', Store, 'spodgi.OdgiStore', 'OdgiStore')
+    s = plugin.get('OdgiStore', Store)(base="http://example.org/test/")
+    spodgi = Graph(store=s)
+    spodgi.open('./test/t.odgi', create=False)
+    node_ids = set(range(s.odgi_graph.min_node_id(), s.odgi_graph.max_node_id() + 1))
+    assert s.neighbourhood([1], hops=len(node_ids)) == node_ids
+    assert s.neighbourhood([1]) == {1}
+    # the subgraph of all nodes is the whole graph
+    from spodgi.export import write_graph
+    out = io.StringIO()
+    write_graph(s.odgi_graph, s.base, out)
+    assert set(f'{t[0]} {t[1]} {t[2]} .' for t in s.subgraph(node_ids)) == set(out.getvalue().splitlines())
+    # only edges between the nodes of the subgraph, and only the steps on them
+    near = s.neighbourhood([1], hops=1)
+    for subject, predicate, obj in s.subgraph([1], hops=1):
+        if subject.startswith('<http://example.org/test/node/') and obj.startswith('<http://example.org/test/node/'):
+            assert int(obj[:-1].split('/')[-1]) in near
+        if predicate in ('<http://biohackathon.org/resource/vg#node>', '<http://biohackathon.org/resource/vg#reverseOfNode>'):
+            assert int(obj[:-1].split('/')[-1]) in near
+    spodgi.close()
+
+
+def test_neighbourhood_distance():
+    import heapq
+    plugin.register('OdgiStore', Store, 'spodgi.OdgiStore', 'OdgiStore')
+    s = plugin.get('OdgiStore', Store)(base="http://example.org/test/")
+    spodgi = Graph(store=s)
+    spodgi.open('./test/t.odgi', create=False)
+    links = [URIRef('http://biohackathon.org/resource/vg#links')]
+    node_ids = set(range(s.odgi_graph.min_node_id(), s.odgi_graph.max_node_id() + 1))
+    length = dict((node_id, s.odgi_graph.get_length(s.odgi_graph.get_handle(node_id))) for node_id in node_ids)
+
+    def fewest_bases(both_directions):
+        # the bases on the nodes between node 1 and each other node, the nodes next to it are at 0
+        bases = {1: 0}
+        waiting = [(0, 1)]
+        while waiting:
+            node_bases, node_id = heapq.heappop(waiting)
+            if node_bases > bases[node_id]:
+                continue
+            others = list(s.linked_node_ids(node_id, links))
+            if both_directions:
+                others.extend(s.linked_node_ids(node_id, links, True))
+            other_bases = node_bases if node_id == 1 else node_bases + length[node_id]
+            for other in others:
+                if other_bases < bases.get(other, other_bases + 1):
+                    bases[other] = other_bases
+                    heapq.heappush(waiting, (other_bases, other))
+        return bases
+
+    for both_directions in (True, False):
+        bases = fewest_bases(both_directions)
+        for distance in range(sum(length.values()) + 1):
+            assert s.neighbourhood([1], distance=distance, both_directions=both_directions) == \
+                set(node_id for node_id, node_bases in bases.items() if node_bases <= distance)
+    # the nodes next to the given ones are at a distance of 0 bases, the hops limit still holds
+    assert s.neighbourhood([1], hops=1, distance=0) == s.neighbourhood([1], hops=1)
+    assert s.neighbourhood([1], hops=0, distance=sum(length.values())) == {1}
+    spodgi.close()
+
+
+def test_server_subgraph():
+    import sparql_server
+    sparql_server.open_graph('./test/t.odgi', 'http://example.org/test/')
+    client = sparql_server.app.test_client()
+    store = sparql_server.spodgi.store
+    for hops, distance, both_directions in ((1, None, True), (None, 0, True), (2, 3, False)):
+        arguments = {'node': '1'}
+        if hops is not None:
+            arguments['hops'] = str(hops)
+        if distance is not None:
+            arguments['distance'] = str(distance)
+        if not both_directions:
+            arguments['direction'] = 'forward'
+        response = client.get('/subgraph', query_string=arguments)
+        assert response.status_code == 200
+        assert response.mimetype == 'application/n-triples'
+        node_ids = store.neighbourhood([1], hops, distance, both_directions)
+        assert set(response.get_data(as_text=True).splitlines()) == \
+            set(f'{t[0]} {t[1]} {t[2]} .' for t in store.subgraph(node_ids))
+    for query_string in ('node=1&hops=abc', 'node=1&distance=1.5', 'node=1&hops=-1', 'node=1&distance=',
+                         'node=x&hops=1', 'hops=1'):
+        assert client.get('/subgraph?' + query_string).status_code == 400
+    sparql_server.spodgi.close()
+
+
+def test_edges_by_object():
+    plugin.register('OdgiStore', Store, 'spodgi.OdgiStore', 'OdgiStore')
+    s = plugin.get('OdgiStore', Store)(base="http://example.org/test/")
+    spodgi = Graph(store=s)
+    spodgi.open('./test/t.odgi', create=False)
+    vg = 'http://biohackathon.org/resource/vg#'
+    node_ids = range(s.odgi_graph.min_node_id(), s.odgi_graph.max_node_id() + 1)
+    for predicate in ('links', 'linksForwardToForward', 'linksForwardToReverse', 'linksReverseToForward',
+                      'linksReverseToReverse'):
+        predicate = URIRef(vg + predicate)
+        scanned = [tuple(map(str, t)) for t, c in s.triples((None, predicate, None))]
+        by_subject = []
+        for node_id in node_ids:
+            node = URIRef(f'http://example.org/test/node/{node_id}')
+            found = [tuple(map(str, t)) for t, c in s.triples((None, predicate, node))]
+            assert sorted(found) == sorted(t for t in scanned if t[2] == str(node))
+            by_subject.extend(tuple(map(str, t)) for t, c in s.triples((node, predicate, None)))
+        assert sorted(by_subject) == sorted(scanned)
+    # each edge once, also one between the right sides of two nodes, and counted as such
+    edges = list(s.edges())
+    assert len(edges) == len(set(edges)) == s.statistics.edge_count
+    assert sorted(edges) == sorted(edge for node_id in node_ids for edge in s.edges([node_id]))
+    spodgi.close()
+
+
+def test_oriented_edge():
+    from spodgi.OdgiStore import oriented_edge
+    vg = 'http://biohackathon.org/resource/vg#'
+    # a -> b is the same edge as flip(b) -> flip(a), from whichever side it is found
+    assert oriented_edge(1, False, 3, True) == oriented_edge(3, False, 1, True) == \
+        (1, URIRef(vg + 'linksForwardToReverse'), 3)
+    assert oriented_edge(2, True, 3, False) == oriented_edge(3, True, 2, False) == \
+        (2, URIRef(vg + 'linksReverseToForward'), 3)
+    assert oriented_edge(1, True, 4, True) == oriented_edge(4, False, 1, False) == \
+        (1, URIRef(vg + 'linksReverseToReverse'), 4)
+    assert oriented_edge(4, True, 1, True) == oriented_edge(1, False, 4, False) == \
+        (1, URIRef(vg + 'linksForwardToForward'), 4)
+    assert oriented_edge(2, False, 2, True) == (2, URIRef(vg + 'linksForwardToReverse'), 2)
+
+
+def test_node_ids():
+    plugin.register('OdgiStore', Store, 'spodgi.OdgiStore', 'OdgiStore')
+    s = plugin.get('OdgiStore', Store)(base="http://example.org/test/")
+    spodgi = Graph(store=s)
+    spodgi.open('./test/t.odgi', create=False)
+    odgi_graph = s.odgi_graph
+    node_ids = list(s.node_ids())
+    assert node_ids == [node_id for node_id in range(odgi_graph.min_node_id(), odgi_graph.max_node_id() + 1)
+                        if odgi_graph.has_node(node_id)]
+    assert [odgi_graph.get_id(handle) for handle in s.handles()] == node_ids
+    assert [node_id for batch in s.node_ids().batches(4) for node_id in batch] == node_ids
+    assert list(s.node_ids().between(node_ids[1], node_ids[-2])) == node_ids[1:-1]
+    spodgi.close()
+
+
+def test_sequence_length_filter():
+    plugin.register('OdgiStore', Store, 'spodgi.OdgiStore', 'OdgiStore')
+    s = plugin.get('OdgiStore', Store)(base="http://example.org/test/")
+    spodgi = Graph(store=s)
+    spodgi.open('./test/t.odgi', create=False)
+    sequences = dict((str(t[0]), str(t[2])) for t, c in s.triples((None, RDF.value, None)))
+    query = 'PREFIX rdf:<http://www.w3.org/1999/02/22-rdf-syntax-ns#> SELECT ?x ?seq WHERE {?x rdf:value ?seq . FILTER(strlen(?seq) > 1 && strlen(?seq) <= 3)}'
+    found = dict((str(r[0]), str(r[1])) for r in spodgi.query(query))
+    assert found == dict((x, seq) for x, seq in sequences.items() if 1 < len(seq) <= 3)
+    assert [str(n) for n in s.nodes_with_length(min_length=2)] == [x for x, seq in sequences.items() if len(seq) >= 2]
+    spodgi.close()
+
+
+def test_kmer_index(tmp_path):
+    import re
+    import shutil
+    import sys
+    from spodgi.kmers import build_kmer_index, header, kmer_codes, path_matches
+    odgi_file = str(tmp_path / 't.odgi')
+    shutil.copyfile('./test/t.odgi', odgi_file)
+    plugin.register('OdgiStore', Store, 'spodgi.OdgiStore', 'OdgiStore')
+    s = plugin.get('OdgiStore', Store)(base="http://example.org/test/")
+    spodgi = Graph(store=s)
+    spodgi.open(odgi_file, create=False)
+    build_kmer_index(s.odgi_graph, odgi_file, 3)
+    spodgi.close()
+    spodgi.open(odgi_file, create=False)
+    assert s.kmerIndex is not None and s.kmerIndex.k == 3
+    sequences = dict((str(t[0]), str(t[2])) for t, c in s.triples((None, RDF.value, None)))
+    for motif in ('[AT]AAT', 'GAT', 'CA[CG]T', 'TTT'):
+        query = f'PREFIX rdf:<http://www.w3.org/1999/02/22-rdf-syntax-ns#> SELECT ?x WHERE {{?x rdf:value ?seq . FILTER(regex(?seq, "{motif}"))}}'
+        assert sorted(str(r[0]) for r in spodgi.query(query)) == sorted(x for x, seq in sequences.items() if re.search(motif, seq))
+        # along the paths, also the matches that span steps
+        for path_iri in s.matching_paths(None):
+            step_index = s.step_index(path_iri.path())
+            sequence = ''.join(s.odgi_graph.get_sequence(s.odgi_graph.get_handle_of_step(step_index.step(rank)))
+                               for rank in step_index.ranks())
+            expected = [(m.start() + 1, m.group(1)) for m in re.finditer(f'(?=({motif}))', sequence)]
+            assert [(begin, found) for p, begin, end, found in path_matches(s, motif, path_iri)] == expected
+    # the node ids of a k-mer that are still held stay readable when the index is closed
+    held = s.kmerIndex.node_ids_of(next(kmer_codes('GAT', 3)))
+    node_ids = list(held)
+    spodgi.close()
+    assert list(held) == node_ids
+    # an index that is cut short, or is not one, is ignored
+    with open(odgi_file + '.kmers', 'rb') as f:
+        data = f.read()
+    # as is one written on a host of the other byte order
+    other_order = (b'big' if sys.byteorder == 'little' else b'little').ljust(8, b'\0')
+    other_host = data[:header.size - 8] + other_order + data[header.size:]
+    for broken in (data[:len(data) - 3], data[:20], b'', b'not an index' * 10, other_host):
+        with open(odgi_file + '.kmers', 'wb') as f:
+            f.write(broken)
+        with pytest.warns(UserWarning):
+            spodgi.open(odgi_file, create=False)
+        assert s.kmerIndex is None
+        spodgi.close()
+    # and one built from an other odgi file of the same size and modification time
+    fields = list(header.unpack_from(data))
+    fields[7] = fields[7] ^ 1
+    with open(odgi_file + '.kmers', 'wb') as f:
+        f.write(header.pack(*fields) + data[header.size:])
+    spodgi.open(odgi_file, create=False)
+    assert s.kmerIndex is None
+    spodgi.close()
+
+
+def test_sidecar(tmp_path):
+    import os
+    import shutil
+    from spodgi.sidecar import build_sidecar
+    odgi_file = str(tmp_path / 't.odgi')
+    shutil.copyfile('./test/t.odgi', odgi_file)
+    plugin.register('OdgiStore', Store, 'spodgi.OdgiStore', 'OdgiStore')
+    s = plugin.get('OdgiStore', Store)(base="http://example.org/test/")
+    spodgi = Graph(store=s)
+    spodgi.open(odgi_file, create=False)
+    assert s.sidecar is None
+    query = 'PREFIX vg:<http://biohackathon.org/resource/vg#> SELECT ?s ?r WHERE {?s vg:node ?n ; vg:rank ?r}'
+    expected = sorted(tuple(map(str, r)) for r in spodgi.query(query))
+    triples = sorted(tuple(map(str, t)) for t, c in s.triples((None, None, None)))
+    edge_count = s.statistics.edge_count
+    build_sidecar(s.odgi_graph, odgi_file)
+    spodgi.close()
+    spodgi.open(odgi_file, create=False)
+    assert s.sidecar is not None
+    assert sorted(tuple(map(str, r)) for r in spodgi.query(query)) == expected
+    assert sorted(tuple(map(str, t)) for t, c in s.triples((None, None, None))) == triples
+    assert s.statistics.edge_count == edge_count
+    # built from the sidecar once per path, and the steps walked once
+    for path_iri in s.matching_paths(None):
+        assert s.step_index(path_iri.path()) is s.step_index(path_iri.path())
+    spodgi.close()
+    # a sidecar that is cut short, or is not one, is ignored
+    with open(odgi_file + '.spidx', 'rb') as f:
+        data = f.read()
+    # as is one written on a host of the other byte order
+    import sys
+    from spodgi.sidecar import header
+    other_order = (b'big' if sys.byteorder == 'little' else b'little').ljust(8, b'\0')
+    other_host = data[:header.size - 8] + other_order + data[header.size:]
+    for broken in (data[:len(data) // 2], data[:20], b'', b'not a sidecar' * 10, other_host):
+        with open(odgi_file + '.spidx', 'wb') as f:
+            f.write(broken)
+        with pytest.warns(UserWarning):
+            spodgi.open(odgi_file, create=False)
+        assert s.sidecar is None
+        assert sorted(tuple(map(str, r)) for r in spodgi.query(query)) == expected
+        spodgi.close()
+    # an other version of the odgi file does not use the sidecar of the first
+    with open(odgi_file + '.spidx', 'wb') as f:
+        f.write(data)
+    os.utime(odgi_file, ns=(0, 0))
+    spodgi.open(odgi_file, create=False)
+    assert s.sidecar is None
+    spodgi.close()
+
+
+def test_paths_looked_up_lazily():
+    plugin.register('OdgiStore', Store, 'spodgi.OdgiStore', 'OdgiStore')
+    s = plugin.get('OdgiStore', Store)(base="http://example.org/test/")
+    spodgi = Graph(store=s)
+    spodgi.open('./test/t.odgi', create=False)
+    assert spodgi.query('''PREFIX vg:<http://biohackathon.org/resource/vg#>
+    ASK {<http://example.org/test/path/x> a vg:Path}''').askAnswer
+    steps = list(spodgi.query('''PREFIX vg:<http://biohackathon.org/resource/vg#>
+    SELECT ?s WHERE {?s vg:path <http://example.org/test/path/x>}'''))
+    assert len(steps) == 10
+    # found by name, without listing all paths
+    assert not s.allPaths
+    assert s.matching_paths(URIRef('http://example.org/test/path/y')) == []
+    assert [str(p) for p in s.matching_paths(None)] == ['http://example.org/test/path/x']
+    assert s.allPaths
+    spodgi.close()
+
+
+def test_server_accept():
+    import sparql_server
+    sparql_server.open_graph('./test/t.odgi', 'http://example.org/test/')
+    client = sparql_server.app.test_client()
+    select = 'SELECT ?s WHERE {?s a <http://biohackathon.org/resource/vg#Node>} LIMIT 1'
+    construct = 'CONSTRUCT {?s ?p ?o} WHERE {?s ?p ?o} LIMIT 2'
+    mixed = 'application/sparql-results+json, text/csv;q=0.5, application/n-triples'
+    for query, accept, mimetype in ((select, mixed, 'application/sparql-results+json'),
+                                  (select, 'text/csv, application/sparql-results+json;q=0.9', 'text/csv'),
+                                  (select, 'application/n-triples', 'application/sparql-results+xml'),
+                                  (select, '', 'application/sparql-results+xml'),
+                                  (construct, mixed, 'application/n-triples'),
+                                  (construct, 'application/sparql-results+json', 'application/n-triples')):
+        response = client.get('/sparql', query_string={'query': query}, headers={'Accept': accept})
+        assert response.status_code == 200
+        assert response.headers['Content-Type'] == mimetype
+        assert len(response.data) > 0
+    sparql_server.spodgi.close()
+
+
+def test_rdflib_export_options(tmp_path):
+    import gzip
+    from click.testing import CliRunner
+    import odgi_to_rdf
+    runner = CliRunner()
+    output = str(tmp_path / 't.nt.gz')
+    result = runner.invoke(odgi_to_rdf.main, ['--rdflib', '--base', 'http://example.org/test/', './test/t.odgi', output])
+    assert result.exit_code == 0
+    exported = Graph()
+    with gzip.open(output, 'rt') as f:
+        exported.parse(data=f.read(), format='nt')
+    assert len(exported) > 40
+    for option in (['--workers', '2'], ['--triples-per-chunk', '10']):
+        result = runner.invoke(odgi_to_rdf.main, ['--rdflib'] + option + ['./test/t.odgi', str(tmp_path / 't.nt')])
+        assert result.exit_code == 2
+
+
+def test_prepared_query_with_bindings(tmp_path):
+    from click.testing import CliRunner
+    from spodgi.results import PreparedQueries, bindings_from
+    import sparql_odgi
+    import sparql_server
+    plugin.register('OdgiStore', Store, 'spodgi.OdgiStore', 'OdgiStore')
+    s = plugin.get('OdgiStore', Store)(base="http://example.org/test/")
+    spodgi = Graph(store=s)
+    spodgi.open('./test/t.odgi', create=False)
+    node = '<http://example.org/test/node/5>'
+    template = 'PREFIX vg:<http://biohackathon.org/resource/vg#> SELECT ?step ?rank WHERE {?step vg:node ?node ; vg:rank ?rank}'
+    inlined = template.replace('?node', node)
+    prepared_queries = PreparedQueries()
+    prepared = prepared_queries.prepare(spodgi, template)
+    # the same query again, written differently, is parsed once
+    assert prepared_queries.prepare(spodgi, template.replace(' WHERE', '\n  WHERE')) is prepared
+    assert prepared_queries.stats()['hits'] == 1
+    # node 5 is the step of path x at rank 3
+    expected = sorted(tuple(map(str, r)) for r in spodgi.query(inlined))
+    assert [rank for step, rank in expected] == ['3']
+    bindings = bindings_from(spodgi, [('node', node)])
+    assert sorted(tuple(map(str, r)) for r in spodgi.query(prepared, initBindings=bindings)) == expected
+    assert bindings_from(spodgi, [('node', 'vg:Node')]) == {Variable('node'): URIRef('http://biohackathon.org/resource/vg#Node')}
+    for term in ('<http://example.org/test/node/5', '"5', 'unknown:node', 'node 5'):
+        with pytest.raises(ValueError):
+            bindings_from(spodgi, [('node', term)])
+    spodgi.close()
+    # the server binds ?node from $node
+    sparql_server.open_graph('./test/t.odgi', 'http://example.org/test/')
+    response = sparql_server.app.test_client().get('/sparql', query_string={'query': template, '$node': node},
+                                                   headers={'Accept': 'text/tab-separated-values'})
+    assert response.status_code == 200
+    rows = response.data.decode('utf-8').splitlines()
+    assert len(rows) == len(expected) + 1
+    assert rows[1].split('\t')[1] == '"3"^^<http://www.w3.org/2001/XMLSchema#integer>'
+    response = sparql_server.app.test_client().get('/sparql', query_string={'query': template, '$node': 'node 5'})
+    assert response.status_code == 400
+    sparql_server.spodgi.close()
+    # the command line binds it from --bind, or from each line of --bindings
+    runner = CliRunner()
+    result = runner.invoke(sparql_odgi.main, ['--base', 'http://example.org/test/', '--bind', f'node={node}',
+                                              './test/t.odgi', template])
+    assert result.exit_code == 0
+    assert len(result.output.splitlines()) == len(expected)
+    bindings_file = tmp_path / 'nodes.tsv'
+    bindings_file.write_text(f'node\n{node}\n{node}\n')
+    result = runner.invoke(sparql_odgi.main, ['--base', 'http://example.org/test/', '--bindings', str(bindings_file),
+                                              './test/t.odgi', template])
+    assert result.exit_code == 0
+    assert len(result.output.splitlines()) == 2 * len(expected)
+    result = runner.invoke(sparql_odgi.main, ['--bind', 'node=<node', './test/t.odgi', template])
+    assert result.exit_code == 2
+
+
+def test_batch_queries(tmp_path):
+    import os
+    from click.testing import CliRunner
+    import sparql_odgi
+    queries = tmp_path / 'queries'
+    other = tmp_path / 'other'
+    queries.mkdir()
+    other.mkdir()
+    (queries / 'nodes.rq').write_text('SELECT ?n WHERE {?n a <http://biohackathon.org/resource/vg#Node>}')
+    (queries / 'ask.rq').write_text('ASK {?n a <http://biohackathon.org/resource/vg#Node>}')
+    (queries / 'notes.txt').write_text('not a query')
+    # the same name in an other directory is written to its own file
+    (other / 'nodes.rq').write_text('SELECT ?n WHERE {?n a <http://biohackathon.org/resource/vg#Node>} LIMIT 1')
+    output_dir = tmp_path / 'results'
+    runner = CliRunner()
+    stdin = 'SELECT ?p WHERE {?p a <http://biohackathon.org/resource/vg#Path>}\n\nASK {?x ?y ?z}\n'
+    result = runner.invoke(sparql_odgi.main, ['--batch', str(queries), '--batch', str(other), '--batch', '-',
+                                              '--output-dir', str(output_dir), './test/t.odgi'], input=stdin)
+    assert result.exit_code == 0
+    assert sorted(os.listdir(output_dir)) == ['ask.srj', 'nodes-2.tsv', 'nodes.tsv', 'query-0000.tsv',
+                                              'query-0002.srj']
+    assert len((output_dir / 'nodes.tsv').read_text().splitlines()) > len((output_dir / 'nodes-2.tsv').read_text().splitlines())
+    assert len(result.stderr.splitlines()) == 5
+    (queries / 'broken.rq').write_text('SELECT ?n WHERE {')
+    result = runner.invoke(sparql_odgi.main, ['--batch', str(queries), '--output-dir', str(output_dir), '--workers', '2',
+                                              './test/t.odgi'])
+    assert result.exit_code == 1
+    assert 'broken\t' in result.stderr and 'failed' in result.stderr
+
+
+def test_admission():
+    import threading
+    import time
+    from spodgi.prefork import Admission
+    entered = threading.Event()
+    go = threading.Event()
+
+    def app(environ, start_response):
+        if environ['PATH_INFO'] == '/fail':
+            raise RuntimeError('the application failed')
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        if environ['PATH_INFO'] == '/stream-fail':
+            def failing():
+                yield b'first'
+                raise RuntimeError('the stream failed')
+            return failing()
+        if environ['PATH_INFO'] == '/block':
+            entered.set()
+            go.wait(5)
+        return [b'done']
+
+    admission = Admission(app, max_active=1, max_waiting=1, timeout=0.2, retry_after=3)
+    statuses = {}
+
+    def request(path):
+        def start_response(status, headers):
+            statuses[path] = (status, dict(headers))
+        result = admission({'PATH_INFO': path}, start_response)
+        try:
+            return b''.join(result)
+        finally:
+            # as a WSGI server does, a refusal is a plain list
+            if hasattr(result, 'close'):
+                result.close()
+
+    def is_free():
+        if admission._active.acquire(blocking=False):
+            admission._active.release()
+            return True
+        return False
+
+    holder = threading.Thread(target=request, args=('/block',))
+    holder.start()
+    assert entered.wait(5)
+    # one request may wait for the slot, until the timeout
+    waiter = threading.Thread(target=request, args=('/wait',))
+    waiter.start()
+    while admission.waiting < 1:
+        time.sleep(0.01)
+    # any more are refused at once
+    request('/refused')
+    assert statuses['/refused'][0].startswith('503')
+    assert statuses['/refused'][1]['Retry-After'] == '3'
+    waiter.join()
+    assert statuses['/wait'][0].startswith('503')
+    assert statuses['/wait'][1]['Retry-After'] == '3'
+    assert admission.refused == 2
+    go.set()
+    holder.join()
+    assert statuses['/block'][0] == '200 OK'
+    assert is_free()
+    # the slot is held until the response has been closed
+    result = admission({'PATH_INFO': '/'}, lambda status, headers: None)
+    assert not is_free()
+    result.close()
+    assert is_free()
+    # and given back when the application raises, or its response does
+    with pytest.raises(RuntimeError):
+        request('/fail')
+    assert is_free()
+    with pytest.raises(RuntimeError):
+        request('/stream-fail')
+    assert is_free()
+    assert request('/') == b'done'
+    # without waiting, a free slot still lets a request in and only a busy worker refuses
+    admission = Admission(app, max_active=1, max_waiting=0, timeout=0.2, retry_after=3)
+    statuses.clear()
+    assert request('/') == b'done'
+    assert statuses['/'][0] == '200 OK'
+    entered.clear()
+    go.clear()
+    holder = threading.Thread(target=request, args=('/block',))
+    holder.start()
+    assert entered.wait(5)
+    request('/refused')
+    assert statuses['/refused'][0].startswith('503')
+    assert admission.refused == 1 and admission.waiting == 0
+    go.set()
+    holder.join()
+    assert statuses['/block'][0] == '200 OK'